@@ -0,0 +1,69 @@
+"""Per-test overhead of the plugin for tests without the `vcr` and `block_network` marks.
+
+Runs the same generated test suite:
+  - without the plugin;
+  - with the plugin;
+  - with the plugin and the `vcr` and `block_network` fixtures requested by every test, as autouse fixtures did.
+
+Usage: python benchmarks/fixture_overhead.py [--tests 20000] [--repeat 3]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+
+TEST = "def test_{0}():\n    pass\n\n\n"
+AUTOUSE_CONFTEST = """
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _recording_fixtures(block_network, vcr):
+    pass
+"""
+SCENARIOS = {
+    "without plugin": (["-p", "no:recording"], ""),
+    "with plugin": ([], ""),
+    "with autouse fixtures": ([], AUTOUSE_CONFTEST),
+}
+
+
+def run(directory: str, args: List[str], repeat: int) -> float:
+    """The best wall time out of `repeat` runs."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "pytest", "-q", "-p", "no:cacheprovider", *args, directory],
+            check=True,
+            stdout=subprocess.DEVNULL,
+        )
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tests", type=int, default=20000, help="Number of generated tests.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per scenario.")
+    options = parser.parse_args()
+    results = {}
+    for name, (args, conftest) in SCENARIOS.items():
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "test_generated.py"), "w") as fd:
+                fd.writelines(TEST.format(idx) for idx in range(options.tests))
+            with open(os.path.join(directory, "conftest.py"), "w") as fd:
+                fd.write(conftest)
+            results[name] = run(directory, args, options.repeat)
+    baseline = results["without plugin"]
+    for name, elapsed in results.items():
+        overhead = (elapsed - baseline) / options.tests * 1_000_000
+        sys.stdout.write("{:<24} {:8.2f}s  {:+8.1f} us/test\n".format(name, elapsed, overhead))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,18 @@
 import hashlib
+import importlib
 import os
-from dataclasses import dataclass
-from itertools import chain, starmap
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import chain, repeat, starmap
 from types import ModuleType
-from typing import Callable, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from _pytest.config import Config
 from _pytest.mark.structures import Mark
 from vcr import VCR
 from vcr.cassette import CassetteContextDecorator
 from vcr.persisters.filesystem import FilesystemPersister
-from vcr.serialize import deserialize
+from vcr.serializers import yamlserializer
 
 try:
     # VCR.py >=5
@@ -19,7 +21,39 @@ except ImportError:  # pragma: no cover
     # VCR.py <5
     CassetteNotFoundError = ValueError
 
+from . import jsonlserializer
+from .blobs import BlobStore, get_blobs_directory
+from .bodies import (
+    deserialize,
+    get_content_size,
+    load_interactions,
+    parse_interactions,
+    serialize,
+    to_plain_interaction,
+)
+from .cache import CassetteCache, PersistentCache
+from .cassette import IndexedCassette
+from .compaction import Compactor
+from .journal import append_interactions, get_cassette_signature, read_journal, remove_journal
+from .parallel import LoadingPool
+from .plan import ItemPlan
+from .preload import Plan, Preloader
+from .registry import VCREntry
+from .sqlite import CassetteDatabase, get_database_path
+from .state import get_state
+from .storage import (
+    SUFFIXES,
+    append_file,
+    decode,
+    open_text,
+    resolve_path,
+    strip_compression_suffix,
+    write_file,
+)
+from .streaming import get_streaming_patch
+from .usage import CassetteUsage, PruneResult, UsageTracker
 from .utils import ConfigType, merge_kwargs, unique, unpack
+from .writer import CassetteWriter
 
 try:
     # Try to get max filename length on Unix-like systems
@@ -29,25 +63,172 @@ except (AttributeError, ValueError, OSError):
     MAX_FILENAME_LEN = 255
 
 
-def load_cassette(cassette_path: str, serializer: ModuleType) -> Tuple[List, List]:
+def load_cassette(
+    cassette_path: str,
+    serializer: ModuleType,
+    cache: Optional[CassetteCache] = None,
+    persistent_cache: Optional[PersistentCache] = None,
+    blobs: Optional[BlobStore] = None,
+) -> Tuple[List, List]:
+    if cache is None or not cache.enabled:
+        requests, responses = read_cassette(cassette_path, serializer, persistent_cache)
+        if blobs is not None:
+            blobs.resolve(responses)
+        return requests, responses
     try:
-        with open(cassette_path, encoding="utf8") as f:
-            cassette_content = f.read()
+        signature = get_cassette_signature(cassette_path)
     except OSError:
         return [], []
-    return deserialize(cassette_content, serializer)
+    cached = cache.get(cassette_path, serializer, signature)
+    if cached is not None:
+        return cached
+    requests, responses = read_cassette(cassette_path, serializer, persistent_cache)
+    # Before caching, so cached cassettes have references to the shared blobs
+    loaded_blobs = blobs.resolve(responses) if blobs is not None else None
+    size = get_content_size(requests, responses)
+    cache.set(cassette_path, serializer, signature, requests, responses, size, loaded_blobs)
+    return requests, responses
+
+
+def read_cassette(
+    cassette_path: str, serializer: ModuleType, persistent_cache: Optional[PersistentCache] = None
+) -> Tuple[List, List]:
+    requests, responses = read_cassette_file(cassette_path, serializer, persistent_cache)
+    journal_requests, journal_responses = read_journal(cassette_path)
+    if journal_requests:
+        # New lists, the ones from the cassette file might be cached
+        return requests + journal_requests, responses + journal_responses
+    return requests, responses
+
+
+def read_cassette_file(
+    cassette_path: str, serializer: ModuleType, persistent_cache: Optional[PersistentCache] = None
+) -> Tuple[List, List]:
+    if persistent_cache is None:
+        try:
+            stream = open_text(cassette_path)
+        except OSError:
+            return [], []
+        with stream:
+            # Some formats could be parsed directly from the (possibly decompressing) stream without reading it upfront
+            content: Any = stream if is_streaming(serializer) else stream.read()
+            return deserialize(content, serializer)
+    try:
+        with open(cassette_path, "rb") as f:
+            raw_content = f.read()
+    except OSError:
+        return [], []
+    interactions = persistent_cache.get(raw_content, serializer)
+    if interactions is None:
+        interactions = parse_interactions(decode(cassette_path, raw_content), serializer)
+        # Before `load_interactions`, it makes bodies lazy in place
+        persistent_cache.set(
+            raw_content, serializer, [to_plain_interaction(interaction) for interaction in interactions]
+        )
+    return load_interactions(interactions)
+
+
+def is_streaming(serializer: ModuleType) -> bool:
+    return serializer is yamlserializer or getattr(serializer, "SUPPORTS_STREAMING", False)
+
+
+def read_cassette_by_name(
+    cassette_path: str, serializer_name: str, persistent_cache: Optional[PersistentCache] = None
+) -> Tuple[List, List]:
+    """Variant of `read_cassette` for worker processes - modules can not be pickled."""
+    return read_cassette(cassette_path, importlib.import_module(serializer_name), persistent_cache)
+
+
+def load_cassettes(
+    paths: List[str],
+    serializer: ModuleType,
+    pool: LoadingPool,
+    cache: Optional[CassetteCache] = None,
+    persistent_cache: Optional[PersistentCache] = None,
+    blobs: Optional[BlobStore] = None,
+) -> List[Tuple[List, List]]:
+    """Load multiple cassettes concurrently, the results are in the same order as paths."""
+    if not pool.uses_processes or not isinstance(serializer, ModuleType):
+        # The in-memory cache is thread-safe and could be shared with workers directly
+        return list(
+            pool.executor.map(
+                load_cassette, paths, repeat(serializer), repeat(cache), repeat(persistent_cache), repeat(blobs)
+            )
+        )
+    results: List[Tuple[List, List]] = [([], [])] * len(paths)
+    futures: Dict[int, Any] = {}
+    signatures = {}
+    for idx, path in enumerate(paths):
+        if cache is not None and cache.enabled:
+            try:
+                signatures[idx] = get_cassette_signature(path)
+            except OSError:
+                continue
+            cached = cache.get(path, serializer, signatures[idx])
+            if cached is not None:
+                results[idx] = cached
+                continue
+        futures[idx] = pool.executor.submit(read_cassette_by_name, path, serializer.__name__, persistent_cache)
+    for idx, future in futures.items():
+        results[idx] = requests, responses = future.result()
+        # Blobs are resolved in the main process to share them via the same cache
+        loaded_blobs = blobs.resolve(responses) if blobs is not None else None
+        if idx in signatures:
+            size = get_content_size(requests, responses)
+            cache.set(  # type: ignore[union-attr]
+                paths[idx], serializer, signatures[idx], requests, responses, size, loaded_blobs
+            )
+    return results
 
 
 @dataclass
 class CombinedPersister(FilesystemPersister):
-    """Load extra cassettes, but saves only the first one."""
+    """Load extra cassettes, but saves only the first one.
+
+    In the lazy mode, only the first non-empty cassette is loaded upfront and the rest are loaded via `load_next`.
+    """
 
     extra_paths: List[str]
+    cache: Optional[CassetteCache] = None
+    persistent_cache: Optional[PersistentCache] = None
+    lazy: bool = False
+    pool: Optional[LoadingPool] = None
+    writer: Optional[CassetteWriter] = None
+    blobs: Optional[BlobStore] = None
+    preloader: Optional[Preloader] = None
+    # The test that uses this persister
+    nodeid: str = ""
+    # Cassettes with journals written in this session and their serializers. Journaling is disabled if it is `None`
+    journals: Optional[Dict[str, ModuleType]] = None
+    usage: Optional[UsageTracker] = None
+    compactor: Optional[Compactor] = None
+    # Bytes saved by compaction per cassette path, reported at the end of the session
+    compaction_savings: Optional[Dict[str, int]] = None
+    pending_paths: List[str] = field(default_factory=list, init=False)
+    # Loaded cassettes and their number of interactions, in the loading order
+    sources: List[Tuple[str, int]] = field(default_factory=list, init=False)
 
     def load_cassette(self, cassette_path: str, serializer: ModuleType) -> Tuple[List, List]:
-        all_paths = chain.from_iterable(((cassette_path,), self.extra_paths))
+        all_paths = chain.from_iterable(((resolve_path(cassette_path),), self.extra_paths))
+        paths = list(unique(all_paths))
+        if self.writer is not None:
+            # Cassettes written by previous tests might be still in the queue
+            for path in paths:
+                self.writer.wait_for(path)
+        if self.preloader is not None:
+            for path in paths:
+                self.preloader.wait_for(path)
+        self.sources = []
+        if self.lazy:
+            self.pending_paths = paths
+            return self.load_first(serializer)
         # Pairs of 2 lists per cassettes:
-        all_content = (load_cassette(path, serializer) for path in unique(all_paths))
+        all_content: Any
+        if self.pool is not None and self.pool.should_be_used(paths):
+            all_content = load_cassettes(paths, serializer, self.pool, self.cache, self.persistent_cache, self.blobs)
+        else:
+            all_content = [self.read(path, serializer) for path in paths]
+        self.sources = [(path, len(content[0])) for path, content in zip(paths, all_content, strict=True)]
         # Two iterators from all pairs from above: all requests, all responses
         # Notes.
         # 1. It is possible to do it with accumulators, for loops and `extend` calls,
@@ -60,6 +241,161 @@ class CombinedPersister(FilesystemPersister):
             raise CassetteNotFoundError("No cassettes found.")
         return requests, responses
 
+    def load_first(self, serializer: ModuleType) -> Tuple[List, List]:
+        """Load pending cassettes until a non-empty one is found."""
+        # The default cassette might be missing or empty
+        while self.pending_paths:
+            requests, responses = self.load_next(serializer)
+            if requests and responses:
+                return requests, responses
+        raise CassetteNotFoundError("No cassettes found.")
+
+    def load_next(self, serializer: ModuleType) -> Tuple[List, List]:
+        """Load the next pending cassette in the declared order."""
+        path = self.pending_paths.pop(0)
+        requests, responses = self.read(path, serializer)
+        self.sources.append((path, len(requests)))
+        return requests, responses
+
+    def read(self, path: str, serializer: ModuleType) -> Tuple[List, List]:
+        """Load a single cassette."""
+        return load_cassette(path, serializer, self.cache, self.persistent_cache, self.blobs)
+
+    def track_usage(self, positions: List[int], serializer: ModuleType) -> None:
+        """Record replayed interactions by their positions in the loaded content."""
+        if self.usage is None or not isinstance(serializer, ModuleType):
+            # Custom serializer objects could not be imported by name for pruning
+            return
+        start = 0
+        for path, size in self.sources:
+            used = [position - start for position in positions if start <= position < start + size]
+            self.usage.add(path, serializer.__name__, size, used)
+            start += size
+
+    def save_cassette(self, cassette_path: str, cassette_dict: ConfigType, serializer: ModuleType) -> None:
+        if self.usage is not None:
+            self.usage.mark_modified(cassette_path)
+        if self.writer is not None:
+            self.writer.submit(
+                cassette_path, partial(self.write_cassette, cassette_path, cassette_dict, serializer), self.nodeid
+            )
+        else:
+            self.write_cassette(cassette_path, cassette_dict, serializer)
+
+    def write_cassette(self, cassette_path: str, cassette_dict: ConfigType, serializer: ModuleType) -> None:
+        """Write the cassette atomically, but only if its content is changed."""
+        if self.compactor is not None:
+            cassette_dict, saved = self.compactor.compact_with_savings(cassette_dict)
+            if self.compaction_savings is not None:
+                self.compaction_savings[cassette_path] = saved
+        if self.blobs is not None:
+            cassette_dict = {**cassette_dict, "responses": self.blobs.externalize(cassette_dict["responses"])}
+        data = serialize(cassette_dict, serializer)
+        write = append_file if getattr(serializer, "SUPPORTS_APPEND", False) else write_file
+        # The whole content is written, including interactions from the journal
+        changed = write(cassette_path, data)
+        if (remove_journal(cassette_path) or changed) and self.cache is not None:
+            self.cache.invalidate(cassette_path)
+
+    def append_cassette(self, cassette_path: str, cassette_dict: ConfigType, serializer: ModuleType) -> bool:
+        """Append new interactions to the cassette journal instead of writing the whole cassette.
+
+        Returns `False` if journaling is disabled or there is no cassette to append to yet.
+        """
+        if self.journals is None or not (os.path.exists(resolve_path(cassette_path)) or cassette_path in self.journals):
+            return False
+        self.journals[cassette_path] = serializer
+        if self.usage is not None:
+            self.usage.mark_modified(cassette_path)
+        if self.writer is not None:
+            self.writer.submit(cassette_path, partial(self.write_journal, cassette_path, cassette_dict), self.nodeid)
+        else:
+            self.write_journal(cassette_path, cassette_dict)
+        return True
+
+    def write_journal(self, cassette_path: str, cassette_dict: ConfigType) -> None:
+        if self.compactor is not None:
+            # Duplicates of interactions that are already in the cassette are not removed
+            cassette_dict = self.compactor.compact(cassette_dict)
+        responses = cassette_dict["responses"]
+        if self.blobs is not None:
+            responses = self.blobs.externalize(responses)
+        append_interactions(cassette_path, cassette_dict["requests"], responses)
+        if self.cache is not None:
+            self.cache.invalidate(cassette_path)
+
+
+@dataclass(kw_only=True)
+class SQLitePersister(CombinedPersister):
+    """Store cassettes in a SQLite database.
+
+    Cassettes that are not in the database yet (e.g. extra cassettes shared between tests) are loaded from files.
+    """
+
+    database: CassetteDatabase
+
+    def track_usage(self, positions: List[int], serializer: ModuleType) -> None:
+        # Pruning is not supported for databases
+        pass
+
+    def read(self, path: str, serializer: ModuleType) -> Tuple[List, List]:
+        name = self.database.get_name(path)
+        if name is not None:
+            requests, responses = self.database.load(name)
+            if requests:
+                return requests, responses
+        return super().read(path, serializer)
+
+    def write_cassette(self, cassette_path: str, cassette_dict: ConfigType, serializer: ModuleType) -> None:
+        name = self.database.get_name(cassette_path)
+        if name is None:
+            super().write_cassette(cassette_path, cassette_dict, serializer)
+        else:
+            if self.compactor is not None:
+                cassette_dict = self.compactor.compact(cassette_dict)
+            self.database.save(name, cassette_dict["requests"], cassette_dict["responses"])
+
+
+def prune_cassette(path: str, usage: CassetteUsage) -> Optional[PruneResult]:
+    """Remove interactions that were not replayed during the session.
+
+    Cassettes without any replayed interactions are removed. Returns `None` if the cassette was changed since
+    it was loaded.
+    """
+    serializer = importlib.import_module(usage.serializer)
+    requests, responses = read_cassette(path, serializer)
+    if len(requests) != usage.size:
+        return None
+    size = get_cassette_signature(path)[1]
+    used = sorted(usage.used)
+    if used:
+        cassette_dict = {
+            "requests": [requests[position] for position in used],
+            "responses": [responses[position] for position in used],
+        }
+        write_file(path, serialize(cassette_dict, serializer))
+        saved_bytes = size - os.path.getsize(path)
+    else:
+        try:
+            os.remove(path)
+        except OSError:
+            # Only the journal exists
+            pass
+        saved_bytes = size
+    remove_journal(path)
+    return PruneResult(path, usage.size - len(used), usage.size, saved_bytes)
+
+
+def get_database(pytestconfig: Config, vcr_cassette_dir: str) -> CassetteDatabase:
+    """Cassette database shared by all tests in the same module or session."""
+    state = get_state(pytestconfig)
+    scope = pytestconfig.getini("recording_sqlite_scope") or "module"
+    path = get_database_path(vcr_cassette_dir, scope, str(pytestconfig.rootpath))
+    database = state.databases.get(path)
+    if database is None:
+        database = state.databases[path] = CassetteDatabase(path)
+    return database
+
 
 def use_cassette(
     default_cassette: str,
@@ -68,32 +404,45 @@ def use_cassette(
     markers: List[Mark],
     config: ConfigType,
     pytestconfig: Config,
+    nodeid: str = "",
+    merged: bool = False,
 ) -> CassetteContextDecorator:
-    """Create a VCR instance and return an appropriate context manager for the given cassette configuration."""
-    merged_config = merge_kwargs(config, markers)
+    """Create a VCR instance and return an appropriate context manager for the given cassette configuration.
 
-    # Check `default_cassette` to prevent it from being too long.
-    suffix = merged_config.get("serializer", ".yaml")
-    if len(default_cassette) + len(suffix) > MAX_FILENAME_LEN:
-        hash_part = hashlib.md5(default_cassette.encode()).hexdigest()
-        prefix = default_cassette[: MAX_FILENAME_LEN - len(suffix) - len(hash_part) - 3]
-        default_cassette = f"{prefix}...{hash_part}"
+    If `merged` is set, then `config` already contains the keyword arguments of `markers`, e.g. from `RecordingPlan`.
+    """
+    # A shallow copy is enough, only top-level keys are changed below
+    merged_config = dict(config) if merged else merge_kwargs(config, markers)
+    state = get_state(pytestconfig)
+    compression = pytestconfig.getini("recording_compression") or None
+
+    default_cassette = truncate_cassette_name(default_cassette, get_suffix(merged_config, compression))
 
     if "record_mode" in merged_config:
         record_mode = merged_config["record_mode"]
-    path_transformer = get_path_transformer(merged_config)
+    chunk_size = merged_config.get("stream_chunk_size")
+    if chunk_size:
+        merged_config["custom_patches"] = (*merged_config.get("custom_patches", ()), get_streaming_patch(chunk_size))
+    path_transformer = get_path_transformer(merged_config, compression)
+    database = None
+    if pytestconfig.getini("recording_store") == "sqlite":
+        database = get_database(pytestconfig, vcr_cassette_dir)
     if record_mode == "rewrite":
         path = path_transformer(os.path.join(vcr_cassette_dir, default_cassette))
-        try:
-            os.remove(path)
-        except OSError:
-            pass
+        if state.writer is not None:
+            state.writer.wait_for(path)
+        # The uncompressed version is used as a fallback for the compressed one
+        for candidate in unique((path, strip_compression_suffix(path))):
+            try:
+                os.remove(candidate)
+            except OSError:
+                pass
+        remove_journal(path)
+        if database is not None:
+            name = database.get_name(path)
+            if name is not None:
+                database.delete(name)
         record_mode = "new_episodes"
-    vcr = VCR(
-        path_transformer=path_transformer,
-        cassette_library_dir=vcr_cassette_dir,
-        record_mode=record_mode,
-    )
 
     def extra_path_transformer(path: str) -> str:
         """Paths in extras can be handled as relative and as absolute.
@@ -105,15 +454,202 @@ def use_cassette(
         return path
 
     extra_paths = [extra_path_transformer(path) for marker in markers for path in marker.args]
-    persister = CombinedPersister(extra_paths)
-    vcr.register_persister(persister)
-    pytestconfig.hook.pytest_recording_configure(config=pytestconfig, vcr=vcr)
-    return vcr.use_cassette(default_cassette, **merged_config)
+    blobs = get_blob_store(pytestconfig, vcr_cassette_dir)
+    compactor = Compactor.from_config(
+        merged_config,
+        pytestconfig.getini("recording_compaction"),
+        pytestconfig.getini("recording_compaction_drop_headers"),
+    )
+    persister: CombinedPersister
+    if database is not None:
+        persister = SQLitePersister(
+            extra_paths,
+            state.cache,
+            state.persistent_cache,
+            lazy=merged_config.get("lazy_extra_cassettes", False),
+            writer=state.writer,
+            blobs=blobs,
+            nodeid=nodeid,
+            compactor=compactor or None,
+            database=database,
+        )
+    else:
+        persister = CombinedPersister(
+            extra_paths,
+            state.cache,
+            state.persistent_cache,
+            lazy=merged_config.get("lazy_extra_cassettes", False),
+            pool=state.loading_pool,
+            writer=state.writer,
+            blobs=blobs,
+            preloader=state.preloader,
+            nodeid=nodeid,
+            journals=state.journals if pytestconfig.getoption("--recording-journal") else None,
+            usage=state.usage,
+            compactor=compactor or None,
+            compaction_savings=state.compaction_savings,
+        )
+
+    def create_vcr() -> VCREntry:
+        vcr = VCR(
+            path_transformer=path_transformer,
+            cassette_library_dir=vcr_cassette_dir,
+            record_mode=record_mode,
+        )
+        register_serializers(vcr)
+        vcr.register_persister(persister)
+        pytestconfig.hook.pytest_recording_configure(config=pytestconfig, vcr=vcr)
+        return VCREntry(vcr, bind_persister=vcr.persister is persister)
+
+    if not should_reuse_vcr(pytestconfig):
+        vcr = create_vcr().vcr
+        # The same as `vcr.use_cassette`, but with a custom cassette class
+        return IndexedCassette.use_arg_getter(partial(vcr.get_merged_config, path=default_cassette, **merged_config))
+    # Everything that is passed to the `VCR` constructor
+    key = (vcr_cassette_dir, record_mode, get_suffix(merged_config, compression))
+    entry = state.vcr_registry.get_vcr(key, create_vcr)
+
+    def get_config() -> ConfigType:
+        resolved = {**state.vcr_registry.get_config(key, entry, merged_config), "path": default_cassette}
+        if entry.bind_persister:
+            resolved["persister"] = persister
+        return resolved
+
+    return IndexedCassette.use_arg_getter(get_config)
+
+
+def register_serializers(vcr: VCR) -> None:
+    vcr.register_serializer("jsonl", jsonlserializer)
+
+
+def should_reuse_vcr(pytestconfig: Config) -> bool:
+    state = get_state(pytestconfig)
+    if state.reuse_vcr is None:
+        state.reuse_vcr = pytestconfig.hook.pytest_recording_reuse_vcr(config=pytestconfig) is not False
+    return state.reuse_vcr
+
+
+def truncate_cassette_name(default_cassette: str, suffix: str) -> str:
+    """Check `default_cassette` to prevent it from being too long."""
+    if len(default_cassette) + len(suffix) > MAX_FILENAME_LEN:
+        hash_part = hashlib.md5(default_cassette.encode()).hexdigest()
+        prefix = default_cassette[: MAX_FILENAME_LEN - len(suffix) - len(hash_part) - 3]
+        default_cassette = f"{prefix}...{hash_part}"
+    return default_cassette
+
+
+def get_blob_store(pytestconfig: Config, vcr_cassette_dir: str) -> Optional[BlobStore]:
+    blob_threshold = pytestconfig.getini("recording_blob_threshold")
+    if not blob_threshold:
+        return None
+    return BlobStore(
+        get_blobs_directory(vcr_cassette_dir),
+        int(blob_threshold) * 1024,
+        get_state(pytestconfig).cache.blobs,
+        lazy=pytestconfig.getini("recording_blob_mmap"),
+    )
+
+
+def get_planned_paths(plan: ItemPlan, compression: Optional[str], with_lazy_extras: bool = True) -> List[str]:
+    """Cassettes of the test, assuming that `vcr_config`, `vcr_cassette_dir` and others are not overridden."""
+    assert plan.default_cassette is not None
+    suffix = get_suffix(plan.kwargs, compression)
+    paths = [
+        get_path_transformer(plan.kwargs, compression)(
+            os.path.join(plan.cassette_dir, truncate_cassette_name(plan.default_cassette, suffix))
+        )
+    ]
+    if with_lazy_extras or not plan.kwargs.get("lazy_extra_cassettes", False):
+        paths.extend(plan.extra_paths)
+    return list(unique(paths))
+
+
+def get_preload_plan(plans: List[ItemPlan], pytestconfig: Config) -> Plan:
+    """Cassettes used by the given tests.
+
+    Wrong guesses only waste some work in background, tests load their actual cassettes anyway.
+    """
+    state = get_state(pytestconfig)
+    compression = pytestconfig.getini("recording_compression") or None
+    vcr = VCR()
+    register_serializers(vcr)
+    preload_plan: Plan = []
+    for plan in plans:
+        if not plan.markers or plan.default_cassette is None:
+            continue
+        serializer = vcr.serializers.get(plan.kwargs.get("serializer", "yaml"))
+        if serializer is None or plan.kwargs.get("record_mode") == "rewrite":
+            continue
+        blobs = get_blob_store(pytestconfig, plan.cassette_dir)
+        cassettes: List[Tuple[str, Callable[[], object]]] = [
+            (path, partial(load_cassette, path, serializer, state.cache, state.persistent_cache, blobs))
+            for path in get_planned_paths(plan, compression, with_lazy_extras=False)
+        ]
+        preload_plan.append((plan.nodeid, cassettes))
+    return preload_plan
+
+
+def preflight(plans: List[ItemPlan], pytestconfig: Config) -> List[str]:
+    """Missing cassettes in the "none" record mode and cassettes that could not be loaded.
+
+    Loaded cassettes are stored in the cache, so tests don't parse them again.
+    """
+    state = get_state(pytestconfig)
+    compression = pytestconfig.getini("recording_compression") or None
+    use_sqlite = pytestconfig.getini("recording_store") == "sqlite"
+    vcr = VCR()
+    register_serializers(vcr)
+    problems = []
+    # Errors by cassette paths, cassettes could be shared by multiple tests
+    errors: Dict[str, Optional[str]] = {}
+    for plan in plans:
+        if not plan.markers or plan.record_mode == "rewrite":
+            continue
+        if plan.default_cassette is None:
+            problems.append("{}: the `default_cassette` mark has no cassette name".format(plan.nodeid))
+            continue
+        serializer = vcr.serializers.get(plan.kwargs.get("serializer", "yaml"))
+        if serializer is None:
+            # Could be registered via the `pytest_recording_configure` hook
+            continue
+        paths = get_planned_paths(plan, compression)
+        if use_sqlite:
+            database = get_database(pytestconfig, plan.cassette_dir)
+            if plan.record_mode == "none" and all(database.get_name(path) is None for path in paths):
+                problems.append("{}: missing cassette {}".format(plan.nodeid, ", ".join(paths)))
+            continue
+        blobs = get_blob_store(pytestconfig, plan.cassette_dir)
+        found = False
+        for path in paths:
+            path = resolve_path(path)
+            try:
+                get_cassette_signature(path)
+            except OSError:
+                continue
+            found = True
+            if path not in errors:
+                errors[path] = None
+                try:
+                    load_cassette(path, serializer, state.cache, state.persistent_cache, blobs)
+                except Exception as exc:
+                    errors[path] = "{}: {}".format(type(exc).__name__, exc)
+            if errors[path] is not None:
+                problems.append("{}: unreadable cassette {}: {}".format(plan.nodeid, path, errors[path]))
+        if not found and plan.record_mode == "none":
+            problems.append("{}: missing cassette {}".format(plan.nodeid, ", ".join(paths)))
+    return problems
+
+
+def get_path_transformer(config: ConfigType, compression: Optional[str] = None) -> Callable:
+    return VCR.ensure_suffix(get_suffix(config, compression))
 
 
-def get_path_transformer(config: ConfigType) -> Callable:
+def get_suffix(config: ConfigType, compression: Optional[str] = None) -> str:
+    """Cassette file suffix, e.g. ".yaml" or ".json.gz"."""
     if "serializer" in config:
         suffix = ".{}".format(config["serializer"])
     else:
         suffix = ".yaml"
-    return VCR.ensure_suffix(suffix)
+    if compression is not None:
+        suffix += SUFFIXES[compression]
+    return suffix
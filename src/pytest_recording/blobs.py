@@ -0,0 +1,130 @@
+import copy
+import hashlib
+import mmap
+import os
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any, Dict, List
+
+from .bodies import LazyBody
+from .storage import write_bytes
+
+# Key of the digest in response bodies that are stored as blobs
+DIGEST_KEY = "sha256"
+BLOBS_DIRECTORY = "blobs"
+
+
+def get_blobs_directory(vcr_cassette_dir: str) -> str:
+    """Blobs are shared by all cassette directories with the same parent, e.g. `tests/cassettes/blobs`."""
+    return os.path.join(os.path.dirname(os.path.normpath(vcr_cassette_dir)), BLOBS_DIRECTORY)
+
+
+def open_mapped(path: str) -> mmap.mmap:
+    """Read-only memory map of the given blob."""
+    with open(path, "rb") as fd:
+        return mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_mapped(path: str) -> Dict[str, Any]:
+    with open_mapped(path) as mapped:
+        return {"string": mapped[:]}
+
+
+class BlobBody(LazyBody):
+    """Response body that is stored as a blob and is read only when the interaction is replayed.
+
+    Not loaded bodies are saved as references to the same blob without reading it.
+    """
+
+    def __init__(self, path: str, digest: str) -> None:
+        super().__init__(partial(read_mapped, path))
+        self.path = path
+        self.digest = digest
+
+    def open(self) -> mmap.mmap:
+        """Memory map of the body, e.g. for streaming it without loading it at once."""
+        return open_mapped(self.path)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> Dict[str, Any]:
+        if not self.is_loaded:
+            return BlobBody(self.path, self.digest)
+        return copy.deepcopy(self.copy(), memo)
+
+
+@dataclass
+class BlobStore:
+    """Content-addressed storage of large response bodies.
+
+    Bodies above the threshold are written once to a file named by their digest, while cassettes keep only
+    the digest. Blobs of cassettes in the cassette cache are shared by all stores, so a body that is recorded in
+    many cached cassettes is held in memory only once. In the lazy mode, blobs are read only when their interactions
+    are replayed.
+    """
+
+    directory: str
+    threshold: int
+    # Blobs of cached cassettes, owned by `CassetteCache` and dropped together with the last cassette that uses them
+    cache: Dict[str, bytes] = field(default_factory=dict)
+    # Read blobs only when they are replayed instead of loading them together with cassettes
+    lazy: bool = False
+
+    def get_path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.get_path(digest)
+        if not os.path.exists(path):
+            write_bytes(path, data)
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        data = self.cache.get(digest)
+        if data is None:
+            try:
+                with open(self.get_path(digest), "rb") as fd:
+                    data = fd.read()
+            except FileNotFoundError:
+                raise FileNotFoundError(f"Response body blob {digest} is not found in {self.directory}") from None
+        return data
+
+    def externalize(self, responses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Replace large bodies with references to blobs.
+
+        Responses are not modified, changed ones are shallow copies.
+        """
+        result = []
+        for response in responses:
+            body = response.get("body")
+            if isinstance(body, BlobBody) and not body.is_loaded:
+                # Not replayed, there is no need to read it
+                response = {**response, "body": {DIGEST_KEY: body.digest}}
+            else:
+                string = (body or {}).get("string")
+                if isinstance(string, str):
+                    string = string.encode("utf8")
+                # Empty blobs can not be memory-mapped
+                if isinstance(string, bytes) and string and len(string) >= self.threshold:
+                    response = {**response, "body": {DIGEST_KEY: self.put(string)}}
+            result.append(response)
+        return result
+
+    def resolve(self, responses: List[Dict[str, Any]]) -> Dict[str, bytes]:
+        """Replace blob references with the actual bodies in place.
+
+        Returns loaded blobs by their digests, so they could be shared via the cassette cache.
+        """
+        loaded: Dict[str, bytes] = {}
+        for response in responses:
+            body = response.get("body")
+            if isinstance(body, dict) and not isinstance(body, LazyBody) and DIGEST_KEY in body:
+                digest = body[DIGEST_KEY]
+                if self.lazy:
+                    response["body"] = BlobBody(self.get_path(digest), digest)
+                else:
+                    del body[DIGEST_KEY]
+                    data = loaded.get(digest)
+                    if data is None:
+                        data = loaded[digest] = self.get(digest)
+                    body["string"] = data
+        return loaded
@@ -0,0 +1,232 @@
+import copy
+from functools import partial
+from types import ModuleType
+from typing import Any, Callable, Dict, ItemsView, Iterable, Iterator, KeysView, List, Optional, Tuple, ValuesView
+
+import yaml
+from vcr import serialize as vcr_serialize
+from vcr.request import Request
+from vcr.serialize import _looks_like_an_old_cassette, _warn_about_old_cassette_format
+
+from .compaction import get_headers_size, get_string_size
+
+# Smaller bodies are cheaper to encode right away than to track lazily
+LAZY_THRESHOLD = 1024
+
+
+class LazyBody(dict):
+    """Recorded response body that is read only when it is accessed for the first time.
+
+    VCR deep-copies responses when they are added to a cassette, copies of a not yet loaded body share its loader.
+    """
+
+    def __init__(self, loader: Callable[[], Dict[str, Any]], *args: Any, size: int = 0, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._loader: Optional[Callable[[], Dict[str, Any]]] = loader
+        # Size of the raw content kept in memory by the loader, for the cassette cache
+        self.size = size
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loader is None
+
+    def load(self) -> None:
+        if self._loader is not None:
+            loader, self._loader = self._loader, None
+            super().update(loader())
+
+    def __getitem__(self, key: Any) -> Any:
+        self.load()
+        return super().__getitem__(key)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.load()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key: Any) -> None:
+        self.load()
+        super().__delitem__(key)
+
+    def __contains__(self, key: object) -> bool:
+        self.load()
+        return super().__contains__(key)
+
+    def __iter__(self) -> Iterator:
+        self.load()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self.load()
+        return super().__len__()
+
+    def __eq__(self, other: object) -> bool:
+        self.load()
+        return super().__eq__(other)
+
+    def __ne__(self, other: object) -> bool:
+        self.load()
+        return super().__ne__(other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        if self._loader is not None:
+            return "<LazyBody (not loaded)>"
+        return super().__repr__()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        self.load()
+        return super().get(key, default)
+
+    def keys(self) -> KeysView:  # type: ignore[override]
+        self.load()
+        return super().keys()
+
+    def values(self) -> ValuesView:  # type: ignore[override]
+        self.load()
+        return super().values()
+
+    def items(self) -> ItemsView:  # type: ignore[override]
+        self.load()
+        return super().items()
+
+    def pop(self, *args: Any) -> Any:
+        self.load()
+        return super().pop(*args)
+
+    def setdefault(self, key: Any, default: Any = None) -> Any:
+        self.load()
+        return super().setdefault(key, default)
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        self.load()
+        super().update(*args, **kwargs)
+
+    def copy(self) -> Dict[str, Any]:
+        self.load()
+        return dict(super().items())
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> Dict[str, Any]:
+        if self._loader is not None:
+            return LazyBody(self._loader, copy.deepcopy(dict(super().items()), memo), size=self.size)
+        return copy.deepcopy(dict(super().items()), memo)
+
+    def __reduce__(self) -> Tuple:
+        # Pickled as a regular dictionary, e.g. for process pools
+        return dict, (self.copy(),)
+
+
+class LazyRequest(Request):
+    """Recorded request that encodes its body only when it is accessed for the first time.
+
+    Matchers that don't use the body (e.g. `method` or `uri`) never trigger encoding.
+    """
+
+    def __init__(self, method: str, uri: str, body: Any, headers: Any) -> None:
+        super().__init__(method, uri, None, headers)
+        # Bypass the `body` setter, it encodes the body
+        self._raw_body = body
+
+    @property
+    def body(self) -> Any:
+        if self._raw_body is not None:
+            Request.body.fset(self, self._raw_body)
+            self._raw_body = None
+        return Request.body.fget(self)
+
+    @body.setter
+    def body(self, value: Any) -> None:
+        self._raw_body = None
+        Request.body.fset(self, value)
+
+
+def encode_body(body: Dict[str, Any]) -> Dict[str, Any]:
+    """The same as `compat.convert_to_bytes` in VCR, but for the body only."""
+    try:
+        return {**body, "string": body["string"].encode("utf-8")}
+    except UnicodeEncodeError:
+        return body
+
+
+def load_response(response: Dict[str, Any]) -> Dict[str, Any]:
+    body = response.get("body")
+    if type(body) is dict:
+        string = body.get("string")
+        if isinstance(string, str):
+            if len(string) >= LAZY_THRESHOLD:
+                response["body"] = LazyBody(partial(encode_body, body), size=len(string))
+            else:
+                response["body"] = encode_body(body)
+    return response
+
+
+def load_interactions(interactions: Iterable[Dict[str, Any]]) -> Tuple[List, List]:
+    """Requests and responses from deserialized interactions, with bodies encoded on first access."""
+    requests = []
+    responses = []
+    for interaction in interactions:
+        request = interaction["request"]
+        requests.append(LazyRequest(request["method"], request["uri"], request["body"], request["headers"]))
+        responses.append(load_response(interaction["response"]))
+    return requests, responses
+
+
+def get_content_size(requests: List, responses: List) -> int:
+    """Approximate size of URIs, headers and bodies of parsed interactions. Lazy bodies are not loaded."""
+    size = 0
+    for request in requests:
+        if isinstance(request, LazyRequest) and request._raw_body is not None:
+            body = request._raw_body
+        else:
+            body = request.body
+        size += len(request.uri) + get_headers_size(request.headers) + get_string_size(body)
+    for response in responses:
+        size += get_headers_size(response.get("headers") or {})
+        body = response.get("body")
+        if isinstance(body, LazyBody) and not body.is_loaded:
+            size += body.size
+        elif isinstance(body, dict):
+            size += get_string_size(body.get("string"))
+    return size
+
+
+def to_plain(response: Dict[str, Any]) -> Dict[str, Any]:
+    """Shallow copy of the response with a plain body dictionary.
+
+    Serializers don't support `LazyBody` and VCR converts bodies to text in place, so the original is not touched.
+    """
+    body = response.get("body")
+    if isinstance(body, dict):
+        return {**response, "body": dict(body.items())}
+    return dict(response)
+
+
+def to_plain_interaction(interaction: Dict[str, Any]) -> Dict[str, Any]:
+    return {**interaction, "response": to_plain(interaction["response"])}
+
+
+def serialize(cassette_dict: Dict[str, Any], serializer: ModuleType) -> str:
+    """The same as `serialize` in VCR, but it supports lazy bodies and doesn't modify responses."""
+    responses = [to_plain(response) for response in cassette_dict["responses"]]
+    return vcr_serialize.serialize({**cassette_dict, "responses": responses}, serializer)
+
+
+def deserialize(cassette: Any, serializer: ModuleType) -> Tuple[List, List]:
+    """The same as `deserialize` in VCR, but with bodies encoded on first access."""
+    return load_interactions(parse_interactions(cassette, serializer))
+
+
+def parse_interactions(cassette: Any, serializer: ModuleType) -> List[Dict[str, Any]]:
+    """Interactions from the serialized cassette, as they are stored in it."""
+    try:
+        data = serializer.deserialize(cassette)
+    except ImportError:
+        # Old cassettes used to use yaml object thingy
+        _warn_about_old_cassette_format()
+    except yaml.constructor.ConstructorError as exc:
+        raise ValueError(
+            f"There was a problem loading the cassette: {exc}. If this is an old cassette, delete it and re-record."
+        ) from exc
+    if _looks_like_an_old_cassette(data):
+        _warn_about_old_cassette_format()
+    return data["interactions"]
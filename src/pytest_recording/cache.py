@@ -0,0 +1,198 @@
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Identifies a particular version of a file on disk
+Signature = Tuple[int, int]
+# The `marshal` format depends on the Python version
+PERSISTENT_CACHE_FORMAT = "marshal-{}-{}.{}".format(marshal.version, *sys.version_info[:2])
+PERSISTENT_CACHE_SUFFIX = ".marshal"
+
+
+def get_signature(path: str) -> Signature:
+    """Modification time & size of the given file."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@dataclass
+class CacheEntry:
+    signature: Signature
+    requests: List
+    responses: List
+    size: int
+    # Digests of response body blobs used by the cassette
+    blobs: Tuple[str, ...] = ()
+
+
+@dataclass
+class CassetteCache:
+    """Session-wide LRU cache of parsed cassettes.
+
+    Entries are keyed by the absolute cassette path and the serializer and are valid only while the file
+    has the same modification time and size. Entries are counted by the approximate size of their URIs, headers and
+    bodies, not by the memory they actually use, therefore `max_size` is a rough bound.
+    """
+
+    max_size: int
+    size: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    # Response body blobs of cached cassettes by their digests, shared by all blob stores.
+    # Their bytes are counted in the sizes of cassettes that use them
+    blobs: Dict[str, bytes] = field(default_factory=dict)
+    _blob_refs: Counter = field(default_factory=Counter)
+    _entries: "OrderedDict[Tuple[str, Any], CacheEntry]" = field(default_factory=OrderedDict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def get(self, path: str, serializer: Any, signature: Signature) -> Optional[Tuple[List, List]]:
+        key = (os.path.abspath(path), serializer)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.signature != signature:
+                if entry is not None:
+                    # The file was changed since it was cached
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Shallow copies - callers are free to modify the lists
+            return list(entry.requests), list(entry.responses)
+
+    def set(
+        self,
+        path: str,
+        serializer: Any,
+        signature: Signature,
+        requests: List,
+        responses: List,
+        size: int,
+        blobs: Optional[Dict[str, bytes]] = None,
+    ) -> None:
+        if size > self.max_size:
+            return
+        key = (os.path.abspath(path), serializer)
+        blobs = blobs or {}
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(signature, list(requests), list(responses), size, tuple(blobs))
+            for digest, data in blobs.items():
+                self.blobs.setdefault(digest, data)
+                self._blob_refs[digest] += 1
+            self.size += size
+            while self.size > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, path: str) -> None:
+        """Drop all entries for the given path, e.g. after it was written."""
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                self._remove(key)
+
+    def _remove(self, key: Tuple[str, Any]) -> None:
+        entry = self._entries.pop(key)
+        self.size -= entry.size
+        for digest in entry.blobs:
+            self._blob_refs[digest] -= 1
+            if not self._blob_refs[digest]:
+                del self._blob_refs[digest]
+                del self.blobs[digest]
+
+
+def get_serializer_name(serializer: Any) -> str:
+    return getattr(serializer, "__name__", None) or type(serializer).__qualname__
+
+
+@dataclass
+class PersistentCache:
+    """Parsed cassettes stored in the pytest cache directory.
+
+    Entries are keyed by a hash of the raw cassette content, therefore they are valid across runs and could be shared
+    between multiple processes (e.g. `pytest-xdist` workers). Every used entry gets its modification time updated,
+    so entries that were not used during a session could be pruned afterwards.
+
+    Entries are interactions as plain data in the `marshal` format. Unlike pickles, loading them can not run code,
+    and they are converted to requests and responses by the caller.
+    """
+
+    directory: str
+    version: str = ""
+    hits: int = 0
+    misses: int = 0
+    started_at: float = field(default_factory=time.time)
+
+    def get_path(self, content: bytes, serializer: Any) -> str:
+        digest = hashlib.sha256()
+        for part in (
+            self.version.encode(),
+            PERSISTENT_CACHE_FORMAT.encode(),
+            get_serializer_name(serializer).encode(),
+            content,
+        ):
+            digest.update(part)
+            digest.update(b"\0")
+        return os.path.join(self.directory, digest.hexdigest() + PERSISTENT_CACHE_SUFFIX)
+
+    def get(self, content: bytes, serializer: Any) -> Optional[List[Dict[str, Any]]]:
+        path = self.get_path(content, serializer)
+        try:
+            with open(path, "rb") as fd:
+                interactions = marshal.load(fd)
+            if not isinstance(interactions, list):
+                raise TypeError("Interactions should be a list")
+            os.utime(path)
+        except Exception:
+            # Missing or broken entry, e.g. from an incompatible version of the plugin
+            self.misses += 1
+            return None
+        self.hits += 1
+        return interactions
+
+    def set(self, content: bytes, serializer: Any, interactions: List[Dict[str, Any]]) -> None:
+        try:
+            data = marshal.dumps(interactions)
+        except ValueError:
+            # Only built-in types are supported, e.g. not iterators in request bodies
+            return
+        path = self.get_path(content, serializer)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # Atomic, concurrent writers produce the same content anyway
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def prune(self) -> int:
+        """Remove entries that were not used since the session start."""
+        removed = 0
+        for entry in os.scandir(self.directory):
+            # Pickles are entries of older versions of the plugin
+            if entry.name.endswith((PERSISTENT_CACHE_SUFFIX, ".pickle")) and entry.stat().st_mtime < self.started_at:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
@@ -0,0 +1,206 @@
+import heapq
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from vcr import matchers
+from vcr.cassette import Cassette
+from vcr.errors import UnhandledHTTPRequestError
+from vcr.matchers import requests_match
+
+# Matchers that compare a single request attribute for equality.
+# Recorded requests are grouped by these attributes, so only requests from the same group should be checked
+EXACT_MATCHERS = {
+    matchers.method: "method",
+    matchers.uri: "uri",
+    matchers.scheme: "scheme",
+    matchers.host: "host",
+    matchers.port: "port",
+    matchers.path: "path",
+}
+
+# Upper bound of recorded requests checked with all matchers to explain why a request has no match
+MAX_EXPLAINED_CANDIDATES = 50
+
+
+def get_path_similarity(path: str, other: str) -> Tuple[int, int]:
+    """The number of common leading path segments, then the closest length."""
+    common = 0
+    for segment, other_segment in zip(path.split("/"), other.split("/"), strict=False):
+        if segment != other_segment:
+            break
+        common += 1
+    return common, -abs(len(path) - len(other))
+
+
+class IndexedCassette(Cassette):
+    """Cassette that looks up recorded requests via an index instead of scanning all of them.
+
+    Requests are bucketed by attributes that are compared by the exact matchers from `match_on`, all other matchers
+    run only against requests in the same bucket. Buckets keep the recording order, therefore the lookup results are
+    the same as for the linear scan.
+
+    Each bucket has a cursor after its leading already played requests. Unless playback repeats are allowed, they
+    can't be played again and are skipped, so repeated identical requests (e.g. polling) find the next unplayed one
+    in constant time.
+
+    If the persister loads cassettes lazily, the next pending cassette is loaded only when the already loaded ones
+    have no matching requests.
+
+    If the persister supports journaling, only interactions recorded during the test are saved via `append_cassette`
+    instead of the whole cassette. If it tracks usage, replayed interactions are reported via `track_usage` by their
+    positions in the content loaded from the persister.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        self._loading = False
+        # Positions of interactions recorded during the test, as opposed to loaded ones
+        self._recorded: List[int] = []
+        # Number of interactions loaded from the persister, including ones filtered out by `before_record_*`
+        self._loaded = 0
+        # Positions in `data` -> positions in the loaded content
+        self._origins: Dict[int, int] = {}
+        super().__init__(*args, **kwargs)
+        self._key_attributes = tuple(EXACT_MATCHERS[matcher] for matcher in self._match_on if matcher in EXACT_MATCHERS)
+        self._index: Dict[Tuple, List[int]] = defaultdict(list)
+        # Bucket key -> number of leading played requests in the bucket
+        self._cursors: Dict[Tuple, int] = {}
+
+    def _get_key(self, request: Any) -> Tuple:
+        return tuple(getattr(request, attribute) for attribute in self._key_attributes)
+
+    def append(self, request: Any, response: Any) -> None:
+        position = len(self.data)
+        super().append(request, response)
+        # The request could be filtered out by `before_record_*` callbacks
+        if self._loading:
+            self._loaded += 1
+        if len(self.data) > position:
+            self._index[self._get_key(self.data[position][0])].append(position)
+            if self._loading:
+                self._origins[position] = self._loaded - 1
+            else:
+                self._recorded.append(position)
+
+    def _load(self) -> None:
+        self._loading = True
+        try:
+            super()._load()
+        finally:
+            self._loading = False
+
+    def _save(self, force: bool = False) -> None:
+        track_usage = getattr(self._persister, "track_usage", None)
+        if track_usage is not None:
+            track_usage(
+                [self._origins[index] for index in self.play_counts if index in self._origins], self._serializer
+            )
+        append_cassette = getattr(self._persister, "append_cassette", None)
+        # Unused interactions are dropped by rewriting the whole cassette
+        drops_unused = getattr(self, "drop_unused_requests", False) and len(self._played_interactions) < len(
+            self._old_interactions
+        )
+        dirty = self.dirty  # type: ignore[has-type]
+        if append_cassette is not None and dirty and not force and not drops_unused and self._recorded:
+            interactions = [self.data[position] for position in self._recorded]
+            cassette_dict = {
+                "requests": [request for request, _ in interactions],
+                "responses": [response for _, response in interactions],
+            }
+            if append_cassette(self._path, cassette_dict, serializer=self._serializer):
+                self._recorded = []
+                self.dirty = False
+                return
+        super()._save(force)
+        self._recorded = []
+
+    def _responses(self, request: Any) -> Iterator[Tuple[int, Any]]:
+        # Played requests are ignored by `play_response` and `__contains__` unless repeats are allowed
+        return self._find(request, skip_played=not self.allow_playback_repeats)
+
+    def responses_of(self, request: Any) -> List[Any]:
+        """The same as in `Cassette`, including already played responses."""
+        responses = [response for _, response in self._find(request, skip_played=False)]
+        if responses:
+            return responses
+        raise UnhandledHTTPRequestError(
+            f"The cassette ({self._path!r}) doesn't contain the request ({request!r}) asked for",
+        )
+
+    def rewind(self) -> None:
+        super().rewind()
+        self._cursors = {}
+
+    def _find(self, request: Any, skip_played: bool) -> Iterator[Tuple[int, Any]]:
+        request = self._before_record_request(request)
+        key = self._get_key(request)
+        checked = 0
+        while True:
+            bucket = self._index.get(key, ())
+            if skip_played:
+                checked = max(checked, self._advance_cursor(key, bucket))
+            while checked < len(bucket):
+                index = bucket[checked]
+                checked += 1
+                stored_request, response = self.data[index]
+                if requests_match(request, stored_request, self._match_on):
+                    yield index, response
+            if not self._load_next():
+                return
+
+    def _advance_cursor(self, key: Tuple, bucket: Sequence[int]) -> int:
+        """Move the bucket cursor past played requests, each of them is passed only once."""
+        cursor = self._cursors.get(key, 0)
+        while cursor < len(bucket) and self.play_counts[bucket[cursor]]:
+            cursor += 1
+        self._cursors[key] = cursor
+        return cursor
+
+    def _load_next(self) -> bool:
+        """Load the next pending cassette from the persister if there is any."""
+        if not getattr(self._persister, "pending_paths", None):
+            return False
+        requests, responses = self._persister.load_next(self._serializer)
+        # The same as in `Cassette._load`
+        dirty = self.dirty  # type: ignore[has-type]
+        self._loading = True
+        try:
+            for request, response in zip(requests, responses, strict=False):
+                self.append(request, response)
+                self._old_interactions.append((request, response))
+        finally:
+            self._loading = False
+        self.dirty = dirty
+        return True
+
+    def find_requests_with_most_matches(self, request: Any) -> List[Tuple[Any, List, List]]:
+        """The same as in `Cassette`, but only the most similar recorded requests are checked with all matchers.
+
+        Candidates are recorded requests with the same host and method, or at least the same host if there are none,
+        ranked by the similarity of their paths.
+        """
+        from vcr.matchers import get_matchers_results
+
+        request = self._before_record_request(request)
+        if not request:
+            return []
+        recorded = [stored_request for stored_request, _ in self.data]
+        same_host = [stored_request for stored_request in recorded if stored_request.host == request.host]
+        candidates = (
+            [stored_request for stored_request in same_host if stored_request.method == request.method]
+            or same_host
+            or recorded
+        )
+        if len(candidates) > MAX_EXPLAINED_CANDIDATES:
+            # Stable, candidates with the same similarity keep the recording order
+            candidates = heapq.nlargest(
+                MAX_EXPLAINED_CANDIDATES,
+                candidates,
+                key=lambda stored_request: get_path_similarity(request.path, stored_request.path),
+            )
+        best_matches = []
+        for stored_request in candidates:
+            successes, fails = get_matchers_results(request, stored_request, self._match_on)
+            best_matches.append((len(successes), stored_request, successes, fails))
+        best_matches.sort(key=lambda match: match[0], reverse=True)
+        # Requests with the most successful matchers, but at least one
+        return [match[1:] for match in best_matches if match[0] and match[0] == best_matches[0][0]]
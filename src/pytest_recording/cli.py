@@ -0,0 +1,258 @@
+"""Maintenance of cassette trees outside of test runs.
+
+Cassettes are processed in parallel by a process pool, the progress is written to stderr and the summary could be
+written as JSON. SQLite databases are imported and exported sequentially.
+"""
+
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional
+
+from ._vcr import load_cassette
+from .bodies import serialize
+from .compaction import STEPS, Compactor
+from .journal import compact as compact_journal
+from .journal import get_cassette_signature, iter_journals, remove_journal
+from .sqlite import (
+    SERIALIZERS,
+    CassetteDatabase,
+    export_cassettes,
+    get_serializer,
+    import_cassettes,
+    iter_cassette_files,
+)
+from .storage import SUFFIXES, strip_compression_suffix, write_file
+
+# Serializer names -> cassette file suffixes
+FORMATS = {"yaml": ".yaml", "json": ".json", "jsonl": ".jsonl"}
+COMPRESSIONS = ("none", *SUFFIXES)
+
+Result = Dict[str, Any]
+
+
+def load(path: str) -> Any:
+    """Cassette content with its journal merged, blobs are left as references."""
+    return load_cassette(path, get_serializer(path))  # type: ignore[arg-type]
+
+
+def get_size(path: str) -> int:
+    """Size of the cassette file together with its journal."""
+    return get_cassette_signature(path)[1]
+
+
+def rewrite(path: str, target: str, cassette_dict: Dict[str, Any]) -> Result:
+    """Write the cassette content to the target path, removing the source and its journal."""
+    size = get_size(path)
+    write_file(target, serialize(cassette_dict, SERIALIZERS[os.path.splitext(strip_compression_suffix(target))[1]]))
+    # The journal is merged into the written content
+    remove_journal(path)
+    if target != path:
+        os.remove(path)
+    return {"path": path, "target": target, "size_before": size, "size_after": os.path.getsize(target)}
+
+
+def get_stats(path: str, top: int) -> Result:
+    requests, responses = load(path)
+    hosts = Counter(request.host for request in requests)
+    bodies = []
+    for request, response in zip(requests, responses, strict=True):
+        string = (response.get("body") or {}).get("string")
+        if string:
+            bodies.append({"uri": request.uri, "size": len(string)})
+    bodies.sort(key=lambda body: body["size"], reverse=True)
+    return {
+        "path": path,
+        "interactions": len(requests),
+        "bytes": get_size(path),
+        "hosts": dict(hosts),
+        "largest_bodies": bodies[:top],
+    }
+
+
+def validate(path: str) -> Result:
+    try:
+        requests, responses = load(path)
+        # Bodies are decoded lazily
+        for request, response in zip(requests, responses, strict=True):
+            request.body  # noqa: B018
+            (response.get("body") or {}).get("string")
+    except Exception as exc:
+        return {"path": path, "valid": False, "error": f"{type(exc).__name__}: {exc}"}
+    return {"path": path, "valid": True, "interactions": len(requests)}
+
+
+def convert(path: str, serializer_name: str) -> Result:
+    uncompressed = strip_compression_suffix(path)
+    base, _ = os.path.splitext(uncompressed)
+    target = base + FORMATS[serializer_name] + path[len(uncompressed) :]
+    requests, responses = load(path)
+    return rewrite(path, target, {"requests": requests, "responses": responses})
+
+
+def recompress(path: str, compression: str) -> Result:
+    target = strip_compression_suffix(path)
+    if compression != "none":
+        target += SUFFIXES[compression]
+    requests, responses = load(path)
+    return rewrite(path, target, {"requests": requests, "responses": responses})
+
+
+def compact(path: str, steps: List[str], drop_headers: List[str]) -> Result:
+    compactor = Compactor.from_config({}, steps, drop_headers)
+    requests, responses = load(path)
+    compacted = compactor.compact({"requests": requests, "responses": responses})
+    result = rewrite(path, path, compacted)
+    result["removed_interactions"] = len(requests) - len(compacted["requests"])
+    return result
+
+
+def fold_journal(path: str) -> Result:
+    serializer = get_serializer(path)
+    # Cassettes in formats that are not known by their suffixes are skipped
+    compacted = serializer is not None and compact_journal(path, serializer)
+    return {"path": path, "compacted": compacted}
+
+
+def run_sqlite(action: str, database_path: str, directory: Optional[str]) -> Dict[str, Any]:
+    """Import or export cassettes in a single process, SQLite databases have one writer at a time."""
+    database = CassetteDatabase(database_path)
+    try:
+        if action == "import":
+            count = import_cassettes(database, directory)  # type: ignore[arg-type]
+        else:
+            count = export_cassettes(database, directory)
+    finally:
+        database.close()
+    return {"command": f"sqlite {action}", "database": database_path, "cassettes": count, "errors": 0}
+
+
+def run(paths: List[str], function: Callable[[str], Result], workers: int) -> List[Result]:
+    """Apply the function to all cassettes, errors are reported as results."""
+    results: List[Result] = []
+
+    def report(path: str, result: Result) -> None:
+        results.append(result)
+        sys.stderr.write("[{}/{}] {}\n".format(len(results), len(paths), path))
+
+    if workers <= 1:
+        for path in paths:
+            try:
+                result = function(path)
+            except Exception as exc:
+                result = {"path": path, "error": f"{type(exc).__name__}: {exc}"}
+            report(path, result)
+    else:
+        with ProcessPoolExecutor(workers) as executor:
+            futures: Dict[Future, str] = {executor.submit(function, path): path for path in paths}
+            for future in as_completed(futures):
+                path = futures[future]
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    result = {"path": path, "error": f"{type(exc).__name__}: {exc}"}
+                report(path, result)
+    results.sort(key=lambda result: result["path"])
+    return results
+
+
+def summarize(command: str, results: List[Result]) -> Dict[str, Any]:
+    summary: Dict[str, Any] = {
+        "command": command,
+        "cassettes": len(results),
+        "errors": sum("error" in result for result in results),
+    }
+    if command == "stats":
+        hosts: Counter = Counter()
+        for result in results:
+            hosts.update(result.get("hosts", {}))
+        summary["interactions"] = sum(result.get("interactions", 0) for result in results)
+        summary["bytes"] = sum(result.get("bytes", 0) for result in results)
+        summary["hosts"] = dict(hosts.most_common())
+    elif command == "validate":
+        summary["invalid"] = sum(not result.get("valid", False) for result in results)
+    elif command == "journals":
+        summary["compacted"] = sum(result.get("compacted", False) for result in results)
+    else:
+        summary["size_before"] = sum(result.get("size_before", 0) for result in results)
+        summary["size_after"] = sum(result.get("size_after", 0) for result in results)
+    summary["results"] = results
+    return summary
+
+
+def run_directory(options: argparse.Namespace) -> Dict[str, Any]:
+    """Apply the subcommand to all cassettes in the directory."""
+    function: Callable[[str], Result]
+    if options.command == "stats":
+        function = partial(get_stats, top=options.top)
+    elif options.command == "validate":
+        function = validate
+    elif options.command == "convert":
+        function = partial(convert, serializer_name=options.serializer)
+    elif options.command == "recompress":
+        function = partial(recompress, compression=options.compression)
+    elif options.command == "compact":
+        function = partial(compact, steps=options.steps, drop_headers=options.drop_headers)
+    else:
+        function = fold_journal
+    if options.command == "journals":
+        paths = list(iter_journals(options.directory))
+    else:
+        paths = list(iter_cassette_files(options.directory))
+    return summarize(options.command, run(paths, function, options.workers))
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Maintain cassette trees: convert, recompress, compact, validate, show statistics and use SQLite databases."""
+    parser = argparse.ArgumentParser(prog="pytest-recording", description=main.__doc__)
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1, help="Number of processes. Default to the number of CPUs."
+    )
+    parser.add_argument("--json", dest="json_path", help="Write the summary as JSON to the given file, `-` for stdout.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    stats_parser = subparsers.add_parser("stats", help="Show interactions, sizes, hosts and the largest bodies.")
+    stats_parser.add_argument("--top", type=int, default=5, help="Number of the largest bodies per cassette.")
+    subparsers.add_parser("validate", help="Check that all cassettes could be loaded.")
+    convert_parser = subparsers.add_parser("convert", help="Change the serializer of cassettes.")
+    convert_parser.add_argument("serializer", choices=FORMATS)
+    recompress_parser = subparsers.add_parser("recompress", help="Change the compression of cassettes.")
+    recompress_parser.add_argument("compression", choices=COMPRESSIONS)
+    compact_parser = subparsers.add_parser("compact", help="Apply compaction steps and fold journals into cassettes.")
+    compact_parser.add_argument("--step", dest="steps", action="append", choices=STEPS, default=[])
+    compact_parser.add_argument("--drop-header", dest="drop_headers", action="append", default=[])
+    subparsers.add_parser(
+        "journals", help="Fold journals into cassettes, cassettes without journals are not rewritten."
+    )
+    for subparser in subparsers.choices.values():
+        subparser.add_argument("directory", help="Directory with cassette files.")
+    sqlite_parser = subparsers.add_parser("sqlite", help="Move cassettes between files and SQLite databases.")
+    sqlite_subparsers = sqlite_parser.add_subparsers(dest="action", required=True)
+    import_parser = sqlite_subparsers.add_parser("import", help="Store cassette files in a database.")
+    import_parser.add_argument("database", help="Path to the database.")
+    import_parser.add_argument("directory", help="Directory with cassette files.")
+    export_parser = sqlite_subparsers.add_parser("export", help="Write cassettes from a database as files.")
+    export_parser.add_argument("database", help="Path to the database.")
+    export_parser.add_argument("directory", nargs="?", help="Target directory. Default to the database directory.")
+    options = parser.parse_args(args)
+    if options.command == "sqlite":
+        summary = run_sqlite(options.action, options.database, options.directory)
+    else:
+        summary = run_directory(options)
+    if options.json_path == "-":
+        sys.stdout.write(json.dumps(summary, indent=2) + "\n")
+    elif options.json_path:
+        with open(options.json_path, "w") as fd:
+            json.dump(summary, fd, indent=2)
+    failed = summary["errors"] or summary.get("invalid")
+    parser.exit(
+        status=1 if failed else 0,
+        message="Processed {} cassette(s), {} error(s)\n".format(summary["cassettes"], summary["errors"]),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Steps that make recorded interactions smaller before cassettes are written."""
+
+import base64
+import copy
+import json
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from .exceptions import UsageError
+from .utils import ConfigType
+
+DECODE_ENCODING = "decode_encoding"
+MINIFY_JSON = "minify_json"
+DROP_HEADERS = "drop_headers"
+DEDUPLICATE = "deduplicate"
+STEPS = (DECODE_ENCODING, MINIFY_JSON, DROP_HEADERS, DEDUPLICATE)
+
+if TYPE_CHECKING:
+    from vcr.request import Request
+
+
+def validate_steps(steps: Iterable[str]) -> None:
+    unknown = [step for step in steps if step not in STEPS]
+    if unknown:
+        raise UsageError(
+            "Unknown compaction steps: {}. Available steps: {}".format(", ".join(unknown), ", ".join(STEPS))
+        )
+
+
+@dataclass(frozen=True)
+class Compactor:
+    """Applies the configured steps to interactions in the order they are listed in `STEPS`.
+
+    Interactions in the cassette are not modified, changed ones are copies.
+    """
+
+    steps: FrozenSet[str]
+    # Lowercase names of headers removed by the `drop_headers` step
+    drop_headers: FrozenSet[str] = frozenset()
+
+    @classmethod
+    def from_config(cls, config: ConfigType, default_steps: List[str], default_drop_headers: List[str]) -> "Compactor":
+        """Options from `vcr_config` or `pytest.mark.vcr` take precedence over the ini ones."""
+        steps = config.get("compaction", default_steps)
+        validate_steps(steps)
+        drop_headers = config.get("compaction_drop_headers", default_drop_headers)
+        return cls(frozenset(steps), frozenset(header.lower() for header in drop_headers))
+
+    def __bool__(self) -> bool:
+        return bool(self.steps)
+
+    def compact(self, cassette_dict: ConfigType) -> ConfigType:
+        return self.compact_with_savings(cassette_dict)[0]
+
+    def compact_with_savings(self, cassette_dict: ConfigType) -> Tuple[ConfigType, int]:
+        """Compacted content and the number of bytes saved in headers and bodies.
+
+        Only headers and bodies replaced by the steps are measured, before serialization.
+        """
+        requests = []
+        responses = []
+        seen: Set[str] = set()
+        saved = 0
+        for request, response in zip(cassette_dict["requests"], cassette_dict["responses"], strict=True):
+            compacted_request, compacted_response = self.compact_interaction(request, response)
+            if DEDUPLICATE in self.steps:
+                key = get_interaction_key(compacted_request, compacted_response)
+                if key in seen:
+                    saved += get_interaction_size(request, response)
+                    continue
+                seen.add(key)
+            saved += get_saved_bytes(request, response, compacted_request, compacted_response)
+            requests.append(compacted_request)
+            responses.append(compacted_response)
+        return {**cassette_dict, "requests": requests, "responses": responses}, saved
+
+    def compact_interaction(self, request: "Request", response: Dict[str, Any]) -> Tuple["Request", Dict[str, Any]]:
+        if DECODE_ENCODING in self.steps and get_header(response, "content-encoding"):
+            from vcr.filters import decode_response
+
+            # Returns a copy
+            response = decode_response(response)
+        if MINIFY_JSON in self.steps:
+            response = minify_json(response)
+        if DROP_HEADERS in self.steps and self.drop_headers:
+            response = {**response, "headers": self._filter_headers(response.get("headers", {}))}
+            request = copy.copy(request)
+            # A new `HeadersDict`, so the original request keeps its headers
+            request.headers = self._filter_headers(request.headers)
+        return request, response
+
+    def _filter_headers(self, headers: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: value for name, value in headers.items() if name.lower() not in self.drop_headers}
+
+
+def get_header(response: Dict[str, Any], name: str) -> List[str]:
+    for key, value in response.get("headers", {}).items():
+        if key.lower() == name:
+            return value
+    return []
+
+
+def minify_json(response: Dict[str, Any]) -> Dict[str, Any]:
+    content_type = get_header(response, "content-type")
+    # Compressed bodies are not touched
+    if not content_type or "json" not in content_type[0] or get_header(response, "content-encoding"):
+        return response
+    body = response.get("body") or {}
+    string = body.get("string")
+    if not string:
+        return response
+    try:
+        minified = json.dumps(json.loads(string), ensure_ascii=False, separators=(",", ":")).encode("utf8")
+    except ValueError:
+        return response
+    if len(minified) >= len(string):
+        return response
+    response = {**response, "body": {**body, "string": minified}}
+    if get_header(response, "content-length"):
+        response["headers"] = {
+            name: [str(len(minified))] if name.lower() == "content-length" else value
+            for name, value in response["headers"].items()
+        }
+    return response
+
+
+def get_saved_bytes(
+    request: "Request", response: Dict[str, Any], compacted_request: "Request", compacted_response: Dict[str, Any]
+) -> int:
+    """Difference in size of headers and bodies that were replaced by compaction steps."""
+    saved = 0
+    if compacted_request.headers is not request.headers:
+        saved += get_headers_size(request.headers) - get_headers_size(compacted_request.headers)
+    if compacted_response.get("headers") is not response.get("headers"):
+        saved += get_headers_size(response.get("headers", {})) - get_headers_size(compacted_response.get("headers", {}))
+    if compacted_response.get("body") is not response.get("body"):
+        saved += get_body_size(response) - get_body_size(compacted_response)
+    return saved
+
+
+def get_interaction_size(request: "Request", response: Dict[str, Any]) -> int:
+    """Size of headers and bodies of an interaction."""
+    return (
+        get_headers_size(request.headers)
+        + get_string_size(request.body)
+        + get_headers_size(response.get("headers", {}))
+        + get_body_size(response)
+    )
+
+
+def get_headers_size(headers: Dict[str, Any]) -> int:
+    # Response headers have lists of values
+    return sum(
+        len(name) + sum(len(item) for item in (value if isinstance(value, list) else [value]))
+        for name, value in headers.items()
+    )
+
+
+def get_body_size(response: Dict[str, Any]) -> int:
+    return get_string_size((response.get("body") or {}).get("string"))
+
+
+def get_string_size(value: Any) -> int:
+    if isinstance(value, str):
+        return len(value.encode("utf8"))
+    return len(value) if value else 0
+
+
+def get_interaction_key(request: "Request", response: Dict[str, Any]) -> str:
+    return json.dumps([request._to_dict(), response], sort_keys=True, default=encode_bytes)
+
+
+def encode_bytes(value: Any) -> str:
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -1,5 +1,6 @@
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 
+import pytest
 from _pytest.config import Config
 
 if TYPE_CHECKING:
@@ -8,3 +9,8 @@ if TYPE_CHECKING:
 
 def pytest_recording_configure(config: Config, vcr: "VCR") -> None:
     pass  # pragma: no cover
+
+
+@pytest.hookspec(firstresult=True)  # type: ignore
+def pytest_recording_reuse_vcr(config: Config) -> Optional[bool]:
+    """Return `False` to create a new VCR instance and call `pytest_recording_configure` for every test."""
@@ -0,0 +1,119 @@
+"""Append-only journals of interactions recorded into existing cassettes.
+
+Instead of rewriting the whole cassette after each new interaction, new interactions are appended to a sidecar
+JSON Lines file next to it. Reads merge the journal into the cassette content, and compaction folds it back into
+the cassette file.
+"""
+
+import os
+from types import ModuleType
+from typing import Iterator, List, Tuple
+
+from vcr.serializers import compat
+
+from . import jsonlserializer
+from .bodies import deserialize, load_interactions, serialize, to_plain
+from .cache import Signature, get_signature
+from .sqlite import get_serializer
+from .storage import SUFFIXES, open_text, resolve_path, strip_compression_suffix, write_file
+
+SUFFIX = ".journal"
+
+
+def get_journal_path(cassette_path: str) -> str:
+    """Compressed and uncompressed versions of the same cassette share the journal."""
+    return strip_compression_suffix(cassette_path) + SUFFIX
+
+
+def get_cassette_signature(cassette_path: str) -> Signature:
+    """Signature of the cassette file combined with its journal, if there is any."""
+    signatures = []
+    for path in (cassette_path, get_journal_path(cassette_path)):
+        try:
+            signatures.append(get_signature(path))
+        except OSError:
+            pass
+    if not signatures:
+        raise FileNotFoundError(cassette_path)
+    # Appending always makes the journal larger, compaction always makes the cassette newer
+    return max(mtime for mtime, _ in signatures), sum(size for _, size in signatures)
+
+
+def append_interactions(cassette_path: str, requests: List, responses: List) -> None:
+    """Append interactions to the cassette journal.
+
+    The same as `serialize` in VCR, but for a single line per interaction.
+    """
+    lines = "".join(
+        jsonlserializer.dump_interaction(
+            {
+                "request": compat.convert_to_unicode(request._to_dict()),
+                "response": compat.convert_to_unicode(to_plain(response)),
+            }
+        )
+        + "\n"
+        for request, response in zip(requests, responses, strict=True)
+    )
+    with open(get_journal_path(cassette_path), "a", encoding="utf8") as fd:
+        fd.write(lines)
+
+
+def read_journal(cassette_path: str) -> Tuple[List, List]:
+    """Interactions from the cassette journal."""
+    try:
+        fd = open(get_journal_path(cassette_path), encoding="utf8")
+    except OSError:
+        return [], []
+    with fd:
+        return load_interactions(jsonlserializer.decode_interaction(item) for item in jsonlserializer.iter_items(fd))
+
+
+def remove_journal(cassette_path: str) -> bool:
+    try:
+        os.remove(get_journal_path(cassette_path))
+    except OSError:
+        return False
+    return True
+
+
+def compact(cassette_path: str, serializer: ModuleType) -> bool:
+    """Fold the journal into the cassette file.
+
+    Returns `True` if there was a journal.
+    """
+    journal_requests, journal_responses = read_journal(cassette_path)
+    if not journal_requests:
+        return remove_journal(cassette_path)
+    try:
+        with open_text(resolve_path(cassette_path)) as fd:
+            requests, responses = deserialize(fd.read(), serializer)
+    except OSError:
+        requests, responses = [], []
+    cassette_dict = {"requests": requests + journal_requests, "responses": responses + journal_responses}
+    write_file(cassette_path, serialize(cassette_dict, serializer))
+    remove_journal(cassette_path)
+    return True
+
+
+def iter_journals(directory: str) -> Iterator[str]:
+    """Paths of cassettes that have journals in the given directory."""
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            if filename.endswith(SUFFIX):
+                path = os.path.join(dirpath, filename[: -len(SUFFIX)])
+                # The journal is shared with the compressed version of the cassette
+                compressed = [path + suffix for suffix in SUFFIXES.values() if os.path.exists(path + suffix)]
+                yield compressed[0] if compressed else path
+
+
+def compact_directory(directory: str) -> int:
+    """Compact all journals in the given directory.
+
+    Cassettes in formats that are not known by their suffixes are skipped.
+    """
+    count = 0
+    for cassette_path in iter_journals(directory):
+        serializer = get_serializer(cassette_path)
+        if serializer is not None and compact(cassette_path, serializer):
+            count += 1
+    return count
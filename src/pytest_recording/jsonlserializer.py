@@ -0,0 +1,85 @@
+"""JSON Lines cassettes: a header line with the cassette version and then one interaction per line.
+
+Cassettes could be parsed line by line while they are read and new interactions could be appended to the end of the
+file without rewriting it. Binary bodies are stored in base64.
+"""
+
+import base64
+import io
+import json
+from functools import partial
+from typing import IO, Any, Dict, Iterable, Iterator, Union
+
+from .bodies import LazyBody
+
+# Used by `CombinedPersister`
+SUPPORTS_STREAMING = True
+SUPPORTS_APPEND = True
+
+# Both use the C accelerated implementation from `_json` if it is available
+_decoder = json.JSONDecoder()
+_encoder = json.JSONEncoder(ensure_ascii=False, check_circular=False, separators=(",", ":"))
+
+
+def deserialize(cassette: Union[str, IO[str]]) -> Dict[str, Any]:
+    lines: Iterable[str] = io.StringIO(cassette) if isinstance(cassette, str) else cassette
+    header: Dict[str, Any] = {}
+    interactions = []
+    for item in iter_items(lines):
+        if not header:
+            header = item
+        else:
+            interactions.append(decode_interaction(item))
+    return {**header, "interactions": interactions}
+
+
+def serialize(cassette_dict: Dict[str, Any]) -> str:
+    header = {key: value for key, value in cassette_dict.items() if key != "interactions"}
+    lines = [_encoder.encode(header)]
+    lines.extend(dump_interaction(interaction) for interaction in cassette_dict["interactions"])
+    return "\n".join(lines) + "\n"
+
+
+def iter_items(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parse non-empty lines, an incomplete last line is skipped."""
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield _decoder.decode(line)
+        except ValueError:
+            if not line.endswith("\n"):
+                # The last line is incomplete, e.g. appending was interrupted
+                return
+            raise
+
+
+def dump_interaction(interaction: Dict[str, Any]) -> str:
+    """A single line without the trailing newline."""
+    return _encoder.encode(encode_interaction(interaction))
+
+
+def encode_interaction(interaction: Dict[str, Any]) -> Dict[str, Any]:
+    request, response = interaction["request"], interaction["response"]
+    if isinstance(request.get("body"), bytes):
+        request = {**request, "body": {"base64": base64.b64encode(request["body"]).decode()}}
+    body = response.get("body")
+    if isinstance(body, dict) and isinstance(body.get("string"), bytes):
+        response = {**response, "body": {"base64": base64.b64encode(body["string"]).decode()}}
+    return {"request": request, "response": response}
+
+
+def decode_interaction(interaction: Dict[str, Any]) -> Dict[str, Any]:
+    request, response = interaction["request"], interaction["response"]
+    body = request.get("body")
+    if isinstance(body, dict) and "base64" in body:
+        request["body"] = base64.b64decode(body["base64"])
+    body = response.get("body")
+    if isinstance(body, dict) and "base64" in body:
+        # Decoded only if the response is replayed
+        response["body"] = LazyBody(partial(decode_body, body["base64"]), size=len(body["base64"]))
+    return interaction
+
+
+def decode_body(data: str) -> Dict[str, Any]:
+    return {"string": base64.b64decode(data)}
@@ -3,7 +3,8 @@ import socket
 import sys
 from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import Any, Callable, Iterator, List, Optional, Tuple, Union
+from functools import lru_cache
+from typing import Any, Callable, Iterator, List, Optional, Pattern, Tuple, Union
 from urllib.parse import urlparse
 
 try:
@@ -47,6 +48,9 @@ except ImportError:
     pycurl = None  # type: ignore
     Curl = None  # type: ignore
 
+# Regexes as passed by users or already compiled via `compile_allowed_hosts`
+AllowedHosts = Optional[Union[List[str], Pattern[str]]]
+
 # `socket.socket` is not patched, because it could be needed for live servers (e.g. pytest-httpbin)
 # But methods that could connect to remote are patched to prevent network access
 _original_connect = socket.socket.connect
@@ -88,7 +92,7 @@ def uninstall_pycurl_wrapper() -> None:
     sys.modules["pycurl"] = pycurl
 
 
-def block_pycurl(allowed_hosts: Optional[List[str]] = None) -> None:
+def block_pycurl(allowed_hosts: AllowedHosts = None) -> None:
     global _disable_pycurl
     global _allowed_hosts
     _disable_pycurl = True
@@ -102,7 +106,7 @@ def unblock_pycurl() -> None:
     _allowed_hosts = None
 
 
-def block_socket(allowed_hosts: Optional[List[str]] = None) -> None:
+def block_socket(allowed_hosts: AllowedHosts = None) -> None:
     socket.socket.connect = make_network_guard(_original_connect, allowed_hosts=allowed_hosts)  # type: ignore
     socket.socket.connect_ex = make_network_guard(_original_connect_ex, allowed_hosts=allowed_hosts)  # type: ignore
 
@@ -112,7 +116,7 @@ def unblock_socket() -> None:
     socket.socket.connect_ex = _original_connect_ex  # type: ignore
 
 
-def make_network_guard(original_func: Callable, allowed_hosts: Optional[List[str]] = None) -> Callable:
+def make_network_guard(original_func: Callable, allowed_hosts: AllowedHosts = None) -> Callable:
     def network_guard(self: Any, address: Union[Tuple, str, bytes], *args: Any, **kwargs: Any) -> Any:
         host = ""  # type: Union[str, bytes, bytearray]
         if self.family in (socket.AF_INET, socket.AF_INET6):
@@ -126,7 +130,10 @@ def make_network_guard(original_func: Callable, allowed_hosts: Optional[List[str
     return network_guard
 
 
-def block(allowed_hosts: Optional[List[str]] = None) -> None:
+def block(allowed_hosts: AllowedHosts = None) -> None:
+    if allowed_hosts is not None and not isinstance(allowed_hosts, re.Pattern):
+        # Once for all connections
+        allowed_hosts = compile_allowed_hosts(tuple(allowed_hosts))
     block_socket(allowed_hosts=allowed_hosts)
     # NOTE: Applying socket blocking makes curl hangs - it should be carefully patched
     block_pycurl(allowed_hosts=allowed_hosts)
@@ -138,7 +145,7 @@ def unblock() -> None:
 
 
 @contextmanager
-def blocking_context(allowed_hosts: Optional[List[str]] = None) -> Iterator[None]:
+def blocking_context(allowed_hosts: AllowedHosts = None) -> Iterator[None]:
     """Block connections via socket and pycurl.
 
     Note:
@@ -161,9 +168,16 @@ def to_string(value: Union[str, bytes, bytearray]) -> str:
     return value
 
 
-def is_host_in_allowed_hosts(host: Union[str, bytes, bytearray], allowed_hosts: Optional[List[str]]) -> bool:
+@lru_cache(maxsize=None)
+def compile_allowed_hosts(allowed_hosts: Tuple[str, ...]) -> Pattern[str]:
+    """A single regex that matches any of the given host regexps. Tests with the same hosts share it."""
+    return re.compile("(" + ")|(".join(allowed_hosts) + ")")
+
+
+def is_host_in_allowed_hosts(host: Union[str, bytes, bytearray], allowed_hosts: AllowedHosts) -> bool:
     """Match provided host to a list of host regexps."""
-    if allowed_hosts is not None:
-        combined = "(" + ")|(".join(allowed_hosts) + ")"
-        return bool(re.match(combined, to_string(host)))
-    return False
+    if allowed_hosts is None:
+        return False
+    if not isinstance(allowed_hosts, re.Pattern):
+        allowed_hosts = compile_allowed_hosts(tuple(allowed_hosts))
+    return bool(allowed_hosts.match(to_string(host)))
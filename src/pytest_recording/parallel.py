@@ -0,0 +1,60 @@
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+EXECUTORS = ("thread", "process")
+
+
+@dataclass
+class LoadingPool:
+    """Workers for loading multiple cassettes concurrently.
+
+    Pure-Python YAML parsing holds the GIL, therefore processes are the better choice without `libyaml`.
+    """
+
+    workers: int
+    kind: str = "thread"
+    # Cassettes smaller than this in total (in bytes) are loaded sequentially to avoid the pool overhead
+    threshold: int = 0
+    _executor: Optional[Executor] = None
+
+    @property
+    def uses_processes(self) -> bool:
+        return self.kind == "process"
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.uses_processes:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_process_context())
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pytest-recording")
+        return self._executor
+
+    def should_be_used(self, paths: List[str]) -> bool:
+        if self.workers < 2 or len(paths) < 2:
+            return False
+        total_size = 0
+        for path in paths:
+            try:
+                total_size += os.path.getsize(path)
+            except OSError:
+                pass
+        return total_size >= self.threshold
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+def get_process_context() -> multiprocessing.context.BaseContext:
+    """Start method for worker processes.
+
+    Forking copies locks held by other threads (e.g. cassette writers or preloaders) in their locked state, which might
+    deadlock the children. The fork server is not available on Windows.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(method)
@@ -0,0 +1,48 @@
+import os
+from dataclasses import dataclass
+from typing import List, Optional
+
+from _pytest.mark.structures import Mark
+
+from .utils import ConfigType
+
+
+@dataclass
+class ItemPlan:
+    """Recording configuration of a test that is known after collection - from its marks and CLI options.
+
+    Fixtures like `vcr_config` or `vcr_cassette_dir` could be overridden per test, they are applied when the test runs.
+    """
+
+    nodeid: str
+    # All `vcr` marks, the closest first
+    markers: List[Mark]
+    block_network: Optional[Mark]
+    # Keyword arguments of all `vcr` marks, the closest ones take precedence
+    kwargs: ConfigType
+    # `None` if the `default_cassette` mark has no arguments
+    default_cassette: Optional[str]
+    # The directory provided by the default `vcr_cassette_dir` fixture
+    cassette_dir: str
+    # From the `block_network` mark or the `--allowed-hosts` CLI option
+    allowed_hosts: Optional[List[str]]
+    # From `vcr` marks or the `--record-mode` CLI option, without `vcr_config`
+    record_mode: str
+
+    @property
+    def extra_paths(self) -> List[str]:
+        """Extra cassettes from `vcr` marks, relative paths are in the cassette directory."""
+        return [
+            path if os.path.isabs(path) else os.path.join(self.cassette_dir, path)
+            for marker in self.markers
+            for path in marker.args
+        ]
+
+
+@dataclass
+class RecordingPlan:
+    """Recording configuration of a running test, shared by the `block_network` and `vcr` fixtures."""
+
+    item: ItemPlan
+    # `vcr_config` merged with keyword arguments of `vcr` marks. Empty if the test has no `vcr` marks
+    config: ConfigType
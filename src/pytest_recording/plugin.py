@@ -1,23 +1,50 @@
+import importlib
 import os
-from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+from importlib.metadata import version
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional
 
 import pytest
 from _pytest.config import Config, PytestPluginManager
 from _pytest.config.argparsing import Parser
 from _pytest.fixtures import SubRequest
 from _pytest.mark.structures import Mark
+from _pytest.terminal import TerminalReporter
 
 if TYPE_CHECKING:
     from vcr.cassette import Cassette
 
 from . import hooks, network
+from .cache import CassetteCache, PersistentCache
+from .compaction import STEPS as COMPACTION_STEPS
+from .parallel import EXECUTORS, LoadingPool
+from .plan import ItemPlan, RecordingPlan
+from .preload import Preloader
+from .serializers import LIBYAML, get_yaml_backend
+from .state import RecordingState, get_state, set_state
+from .storage import CODECS
+from .usage import UsageTracker, format_results
 from .utils import merge_kwargs
 from .validation import validate_block_network_mark
+from .writer import CassetteWriter
 
 RECORD_MODES = ("once", "new_episodes", "none", "all", "rewrite")
+STORES = ("files", "sqlite")
+SQLITE_SCOPES = ("module", "session")
+# In megabytes
+DEFAULT_CACHE_SIZE = 128
+# In kilobytes
+DEFAULT_PARALLEL_THRESHOLD = 1024
+# Fixtures that could change the record mode or cassette paths of `ItemPlan`
+PLANNED_FIXTURES = ("vcr_config", "vcr_cassette_dir", "default_cassette_name", "record_mode", "vcr_markers")
 
 
 def pytest_configure(config: Config) -> None:
+    cache_size = config.getoption("--recording-cache-size")
+    if cache_size is None:
+        cache_size = DEFAULT_CACHE_SIZE
+    state = RecordingState(cache=CassetteCache(max_size=int(cache_size * 1024 * 1024)))
+    # Before anything that could raise, so `pytest_unconfigure` always has the state
+    set_state(config, state)
     if config.pluginmanager.has_plugin("vcr"):
         raise RuntimeError(
             "`pytest-recording` is incompatible with `pytest-vcr`. "
@@ -31,13 +58,425 @@ def pytest_configure(config: Config) -> None:
         "allowed_hosts: List of regexes to match hosts to where connection must be allowed.",
     )
     network.install_pycurl_wrapper()
+    if config.getoption("--recording-persistent-cache"):
+        # Missing if the `cacheprovider` plugin is disabled
+        pytest_cache = getattr(config, "cache", None)
+        if pytest_cache is None:
+            raise pytest.UsageError(
+                "`--recording-persistent-cache` requires the pytest cache. Please, don't pass `-p no:cacheprovider`."
+            )
+        directory = str(pytest_cache.mkdir("recording"))
+        state.persistent_cache = PersistentCache(
+            directory, version="{}-{}".format(version("pytest-recording"), version("vcrpy"))
+        )
+    load_workers = config.getoption("--recording-load-workers")
+    if load_workers:
+        state.loading_pool = LoadingPool(
+            load_workers,
+            kind=config.getoption("--recording-load-executor"),
+            threshold=config.getoption("--recording-parallel-threshold") * 1024,
+        )
+    write_workers = config.getoption("--recording-write-workers")
+    if write_workers:
+        state.writer = CassetteWriter(write_workers)
+    if config.getoption("--recording-track-usage") or config.getoption("--recording-prune"):
+        state.usage = UsageTracker()
+        config.pluginmanager.register(CompletionTracker(state), "recording-completion")
+    if config.getoption("--recording-require-fast-yaml") and get_yaml_backend() != LIBYAML:
+        raise pytest.UsageError(
+            "`--recording-require-fast-yaml` is passed, but PyYAML is built without `libyaml`. "
+            "Please, reinstall PyYAML with `libyaml` support."
+        )
+    compression = config.getini("recording_compression")
+    if compression and compression not in CODECS:
+        raise pytest.UsageError(
+            "Invalid `recording_compression` value: {!r}. Available codecs: {}".format(compression, ", ".join(CODECS))
+        )
+    blob_threshold = config.getini("recording_blob_threshold")
+    if blob_threshold and not blob_threshold.isdigit():
+        raise pytest.UsageError(
+            "Invalid `recording_blob_threshold` value: {!r}. It should be a non-negative integer".format(blob_threshold)
+        )
+    store = config.getini("recording_store")
+    if store not in STORES:
+        raise pytest.UsageError(
+            "Invalid `recording_store` value: {!r}. Available stores: {}".format(store, ", ".join(STORES))
+        )
+    steps = [step for step in config.getini("recording_compaction") if step not in COMPACTION_STEPS]
+    if steps:
+        raise pytest.UsageError(
+            "Invalid `recording_compaction` value: {!r}. Available steps: {}".format(
+                ", ".join(steps), ", ".join(COMPACTION_STEPS)
+            )
+        )
+    scope = config.getini("recording_sqlite_scope")
+    if scope not in SQLITE_SCOPES:
+        raise pytest.UsageError(
+            "Invalid `recording_sqlite_scope` value: {!r}. Available scopes: {}".format(scope, ", ".join(SQLITE_SCOPES))
+        )
 
 
-def pytest_unconfigure() -> None:
+def pytest_unconfigure(config: Config) -> None:
     network.uninstall_pycurl_wrapper()
+    state = get_state(config)
+    if state.loading_pool is not None:
+        state.loading_pool.shutdown()
+    if state.preloader is not None:
+        state.preloader.close()
+    if state.writer is not None:
+        # In case if the session was interrupted before `pytest_sessionfinish`
+        state.writer.close()
+    for database in state.databases.values():
+        database.close()
+
+
+def pytest_report_header() -> str:
+    return "recording: YAML backend: {}".format(get_yaml_backend())
+
+
+@pytest.hookimpl(trylast=True)  # type: ignore
+def pytest_collection_modifyitems(config: Config, items: List[pytest.Item]) -> None:
+    """Request the `block_network` and `vcr` fixtures only for tests that need them.
+
+    It runs after other plugins, so markers they add during collection are taken into account.
+    """
+    state = get_state(config)
+    block_all = config.getoption("--block-network")
+    recording_disabled = config.getoption("--disable-recording")
+    for item in items:
+        names = []
+        if block_all or item.get_closest_marker("block_network") is not None:
+            names.append("block_network")
+        if not recording_disabled and item.get_closest_marker("vcr") is not None:
+            names.append("vcr")
+        if names:
+            state.plans[item.nodeid] = get_item_plan(item)
+            request_fixtures(item, names)
+
+
+def get_item_plan(item: pytest.Item) -> ItemPlan:
+    config = item.config
+    markers = list(item.iter_markers(name="vcr"))
+    kwargs = merge_kwargs({}, markers)
+    marker = item.get_closest_marker("default_cassette")
+    if marker is not None:
+        default_cassette = marker.args[0] if marker.args else None
+    else:
+        default_cassette = get_default_cassette_name(getattr(item, "cls", None), item.name)
+    block_network = item.get_closest_marker("block_network")
+    allowed_hosts = getattr(block_network, "kwargs", {}).get("allowed_hosts") or config.getoption("--allowed-hosts")
+    if isinstance(allowed_hosts, str):
+        allowed_hosts = allowed_hosts.split(",")
+    module = item.fspath
+    return ItemPlan(
+        nodeid=item.nodeid,
+        markers=markers,
+        block_network=block_network,
+        kwargs=kwargs,
+        default_cassette=default_cassette,
+        cassette_dir=os.path.join(module.dirname, "cassettes", module.purebasename),
+        allowed_hosts=allowed_hosts,
+        record_mode=kwargs.get("record_mode") or config.getoption("--record-mode") or "none",
+    )
+
+
+def get_plan(item: pytest.Item) -> ItemPlan:
+    """The plan computed after collection, or a new one, e.g. for tests that request the `vcr` fixture directly."""
+    plans = get_state(item.config).plans
+    plan = plans.get(item.nodeid)
+    if plan is None:
+        plan = plans[item.nodeid] = get_item_plan(item)
+    return plan
+
+
+def request_fixtures(item: pytest.Item, names: List[str]) -> None:
+    """Add fixtures to the item at the same place pytest puts autouse fixtures - before other function-scoped ones."""
+    fixturenames = getattr(item, "fixturenames", None)
+    fixtureinfo = getattr(item, "_fixtureinfo", None)
+    if fixturenames is None or fixtureinfo is None:
+        # Not a function, e.g. an item from a plugin for non-Python tests
+        return
+    name2fixturedefs = fixtureinfo.name2fixturedefs
+
+    def is_function_scoped(name: str) -> bool:
+        fixturedefs = name2fixturedefs.get(name)
+        return not fixturedefs or fixturedefs[-1].scope == "function"
+
+    # Fixtures that are requested explicitly are moved there as well, as if they were autouse
+    for name in names:
+        if name in fixturenames:
+            fixturenames.remove(name)
+    position = next(
+        (idx for idx, name in enumerate(fixturenames) if is_function_scoped(name)),
+        len(fixturenames),
+    )
+    fixturenames[position:position] = names
+
+
+def pytest_collection_finish(session: pytest.Session) -> None:
+    config = session.config
+    state = get_state(config)
+    if (
+        config.getoption("--recording-preflight")
+        and not config.getoption("--disable-recording")
+        # The main process checks all selected tests
+        and not is_xdist_worker(config)
+    ):
+        from ._vcr import preflight
+
+        # Cassette paths and record modes of tests that override recording fixtures are known only at run time
+        plans = [
+            state.plans[item.nodeid]
+            for item in session.items
+            if item.nodeid in state.plans and not overrides_fixtures(item, PLANNED_FIXTURES)
+        ]
+        problems = preflight(plans, config)
+        if problems:
+            raise pytest.UsageError(
+                "Recording preflight found {} problem(s):\n{}".format(
+                    len(problems), "\n".join("  {}".format(problem) for problem in problems)
+                )
+            )
+    if (
+        not config.getoption("--recording-preload")
+        or config.getoption("--disable-recording")
+        or config.getoption("--record-mode") == "rewrite"
+        or config.getini("recording_store") == "sqlite"
+        # Workers collect all tests, but run only some of them in an order that is not known upfront
+        or is_xdist_worker(config)
+        # Preloaded cassettes are stored in the cache
+        or not state.cache.enabled
+    ):
+        return
+    from ._vcr import get_preload_plan
+
+    # The other half is for cassettes that are already used by tests
+    state.preloader = Preloader(config.getoption("--recording-preload-workers"), budget=state.cache.max_size // 2)
+    state.preloader.start(get_preload_plan(get_selected_plans(session), config))
+
+
+def overrides_fixtures(item: pytest.Item, names: Iterable[str]) -> bool:
+    """Whether any of the given fixtures is defined outside of this plugin for the item, e.g. in a conftest."""
+    fixturemanager = item.session._fixturemanager
+    for name in names:
+        try:
+            fixturedefs = fixturemanager.getfixturedefs(name, item)
+        except AttributeError:
+            # pytest < 8.1 accepts node ids
+            fixturedefs = fixturemanager.getfixturedefs(name, item.nodeid)  # type: ignore[arg-type]
+        if fixturedefs and fixturedefs[-1].func.__module__ != __name__:
+            return True
+    return False
+
+
+def get_selected_plans(session: pytest.Session) -> List[ItemPlan]:
+    """Plans of tests that will run, in their order."""
+    plans = get_state(session.config).plans
+    return [plans[item.nodeid] for item in session.items if item.nodeid in plans]
+
+
+@pytest.hookimpl(trylast=True)  # type: ignore
+def pytest_runtest_teardown(item: pytest.Item) -> None:
+    preloader = get_state(item.config).preloader
+    if preloader is not None:
+        preloader.release(item.nodeid)
+
+
+def pytest_sessionfinish(session: pytest.Session) -> None:
+    config = session.config
+    state = get_state(config)
+    if state.writer is not None:
+        state.writer.flush()
+        if state.writer.errors and session.exitstatus == pytest.ExitCode.OK:
+            session.exitstatus = pytest.ExitCode.TESTS_FAILED
+    if state.journals and is_xdist_worker(config):
+        # Other workers might still append to the same journals, only the main process compacts them
+        journals = {path: serializer.__name__ for path, serializer in state.journals.items()}
+        config.workeroutput["recording_journals"] = journals  # type: ignore[attr-defined]
+    elif state.journals and not config.getoption("--recording-keep-journal"):
+        from .journal import compact
+
+        for path, serializer in state.journals.items():
+            compact(path, serializer)
+            state.cache.invalidate(path)
+        state.journals.clear()
+    if state.usage is not None:
+        state.incomplete |= bool(state.unfinished)
+        if is_xdist_worker(config):
+            # Aggregated by the main process in `pytest_testnodedown`
+            data = {**state.usage.dump(), "deselected": state.deselected, "incomplete": state.incomplete}
+            config.workeroutput["recording_usage"] = data  # type: ignore[attr-defined]
+        elif config.getoption("--recording-prune"):
+            # Shared cassettes might be replayed by tests that were not collected
+            state.partial = is_partial_run(config)
+            if (
+                session.exitstatus == pytest.ExitCode.OK
+                and not state.partial
+                and not state.deselected
+                and not state.incomplete
+            ):
+                from ._vcr import prune_cassette
+
+                for path, usage in sorted(state.usage.get_unused().items()):
+                    result = prune_cassette(path, usage)
+                    if result is not None:
+                        state.pruned.append(result)
+                        state.cache.invalidate(path)
+    persistent_cache = state.persistent_cache
+    # Only the main process prunes the cache, `pytest-xdist` workers see only their own entries
+    if persistent_cache is not None and config.getoption("--recording-prune-cache") and not is_xdist_worker(config):
+        persistent_cache.prune()
+
+
+def pytest_deselected(items: List[pytest.Item]) -> None:
+    if items:
+        get_state(items[0].config).deselected = True
+
+
+@pytest.hookimpl(optionalhook=True)  # type: ignore
+def pytest_testnodedown(node: Any, error: Any) -> None:
+    """Aggregate the usage of cassettes and written journals from `pytest-xdist` workers."""
+    workeroutput = getattr(node, "workeroutput", {})
+    state = get_state(node.config)
+    for path, serializer_name in workeroutput.get("recording_journals", {}).items():
+        state.journals[path] = importlib.import_module(serializer_name)
+    data = workeroutput.get("recording_usage")
+    if data is not None and state.usage is not None:
+        state.usage.merge(data)
+        state.deselected |= data["deselected"]
+        state.incomplete |= data["incomplete"]
+
+
+class CompletionTracker:
+    """Tests with `vcr` marks that didn't run completely, e.g. skipped or xfailed ones.
+
+    They might not load their cassettes, so interactions they use would look unused and would be pruned.
+    """
+
+    def __init__(self, state: RecordingState) -> None:
+        self.state = state
+
+    def pytest_runtest_logreport(self, report: pytest.TestReport) -> None:
+        if "vcr" not in report.keywords:
+            return
+        if report.skipped or hasattr(report, "wasxfail"):
+            self.state.incomplete = True
+        elif report.when == "setup":
+            self.state.unfinished.add(report.nodeid)
+        elif report.when == "call":
+            self.state.unfinished.discard(report.nodeid)
+
+
+def is_partial_run(config: Config) -> bool:
+    """Whether only a part of the configured test tree is collected, e.g. a single file or a node id."""
+    if config.getoption("deselect", None) or config.getoption("ignore", None) or config.getoption("ignore_glob", None):
+        return True
+    if config.getoption("lf", False):
+        return True
+    rootdir = str(config.rootpath)
+    roots = {rootdir, *(os.path.join(rootdir, path) for path in config.getini("testpaths"))}
+    roots = {os.path.normpath(root) for root in roots}
+    invocation_dir = str(config.invocation_params.dir)
+    for arg in config.option.file_or_dir or []:
+        if "::" in arg or os.path.normpath(os.path.join(invocation_dir, arg)) not in roots:
+            return True
+    return False
+
+
+def is_xdist_worker(config: Config) -> bool:
+    return hasattr(config, "workerinput")
+
+
+def pytest_terminal_summary(terminalreporter: TerminalReporter, config: Config) -> None:
+    state = get_state(config)
+    if state.writer is not None and state.writer.errors:
+        terminalreporter.write_sep("=", "cassette write errors", red=True)
+        for error in state.writer.errors:
+            terminalreporter.write_line(
+                "ERROR {} - failed to write {}: {!r}".format(error.nodeid, error.path, error.error)
+            )
+    cache = state.cache
+    if cache.hits or cache.misses:
+        terminalreporter.write_line(
+            "Cassette cache: {} hits, {} misses, {} evictions".format(cache.hits, cache.misses, cache.evictions)
+        )
+    persistent_cache = state.persistent_cache
+    if persistent_cache is not None and (persistent_cache.hits or persistent_cache.misses):
+        terminalreporter.write_line(
+            "Persistent cassette cache: {} hits, {} misses".format(persistent_cache.hits, persistent_cache.misses)
+        )
+    if state.compaction_savings:
+        terminalreporter.write_sep("=", "compacted cassettes")
+        for path, saved in sorted(state.compaction_savings.items()):
+            terminalreporter.write_line("{}: saved {} bytes".format(path, saved))
+        terminalreporter.write_line("Saved {} bytes in total".format(sum(state.compaction_savings.values())))
+    usage = state.usage
+    if usage is not None and not is_xdist_worker(config):
+        unused = usage.get_unused()
+        terminalreporter.write_line(
+            "Cassette usage: {} of {} cassettes have interactions that were not replayed".format(
+                len(unused), len(usage.cassettes)
+            )
+        )
+        if state.pruned:
+            terminalreporter.write_sep("=", "pruned cassettes")
+            for line in format_results(state.pruned):
+                terminalreporter.write_line(line)
+        elif config.getoption("--recording-prune") and state.partial:
+            terminalreporter.write_line(
+                "Cassettes are not pruned: only a part of the test tree was selected via arguments, "
+                "`--deselect` or `--ignore`",
+                yellow=True,
+            )
+        elif config.getoption("--recording-prune") and unused:
+            terminalreporter.write_line(
+                "Cassettes are not pruned: some tests failed, were skipped or deselected", yellow=True
+            )
 
 
 def pytest_addoption(parser: Parser) -> None:
+    parser.addini(
+        "recording_compression",
+        help="Compression codec for recorded cassettes: {}. Default to no compression.".format(", ".join(CODECS)),
+        default="",
+    )
+    parser.addini(
+        "recording_blob_threshold",
+        help="Store response bodies of at least this size (in KB) once in a shared blob storage and keep only "
+        "their digests in cassettes. Disabled by default.",
+        default="",
+    )
+    parser.addini(
+        "recording_blob_mmap",
+        type="bool",
+        help="Read response body blobs via mmap only when their interactions are replayed.",
+        default=False,
+    )
+    parser.addini(
+        "recording_compaction",
+        type="linelist",
+        help="Steps applied to recorded interactions before cassettes are written: {}. Disabled by default.".format(
+            ", ".join(COMPACTION_STEPS)
+        ),
+        default=[],
+    )
+    parser.addini(
+        "recording_compaction_drop_headers",
+        type="linelist",
+        help="Headers removed from recorded interactions by the `drop_headers` compaction step.",
+        default=[],
+    )
+    parser.addini(
+        "recording_store",
+        help="Where cassettes are stored: {}. Default to files.".format(", ".join(STORES)),
+        default="files",
+    )
+    parser.addini(
+        "recording_sqlite_scope",
+        help="Whether SQLite cassette databases are shared by tests in a module or in the whole session: {}. "
+        "Default to module.".format(", ".join(SQLITE_SCOPES)),
+        default="module",
+    )
     group = parser.getgroup("recording")
     group.addoption(
         "--record-mode",
@@ -64,6 +503,108 @@ def pytest_addoption(parser: Parser) -> None:
         default=False,
         help="Disable VCR.py integration.",
     )
+    group.addoption(
+        "--recording-cache-size",
+        action="store",
+        type=float,
+        default=None,
+        help="Size limit (in MB) for parsed cassettes shared between tests, measured by their URIs, headers and bodies. "
+        "It is not a memory limit. Default to {}, 0 disables the cache.".format(DEFAULT_CACHE_SIZE),
+    )
+    group.addoption(
+        "--recording-persistent-cache",
+        action="store_true",
+        default=False,
+        help="Store parsed cassettes in the pytest cache directory to reuse them across runs.",
+    )
+    group.addoption(
+        "--recording-prune-cache",
+        action="store_true",
+        default=False,
+        help="Remove persistent cache entries that were not used during the session.",
+    )
+    group.addoption(
+        "--recording-load-workers",
+        action="store",
+        type=int,
+        default=0,
+        help="Number of workers for loading multiple cassettes of a test concurrently. Default to 0 (sequential).",
+    )
+    group.addoption(
+        "--recording-load-executor",
+        action="store",
+        default="thread",
+        choices=EXECUTORS,
+        help='Kind of workers for loading cassettes concurrently. Default to "thread".',
+    )
+    group.addoption(
+        "--recording-parallel-threshold",
+        action="store",
+        type=int,
+        default=DEFAULT_PARALLEL_THRESHOLD,
+        help="Minimal total size (in KB) of test cassettes to load them concurrently. Default to {}.".format(
+            DEFAULT_PARALLEL_THRESHOLD
+        ),
+    )
+    group.addoption(
+        "--recording-write-workers",
+        action="store",
+        type=int,
+        default=0,
+        help="Number of background threads for writing cassettes. Default to 0 (write during the test teardown).",
+    )
+    group.addoption(
+        "--recording-require-fast-yaml",
+        action="store_true",
+        default=False,
+        help="Fail if PyYAML is built without libyaml and cassettes are parsed in pure Python.",
+    )
+    group.addoption(
+        "--recording-preload",
+        action="store_true",
+        default=False,
+        help="Load cassettes in background threads after collection, in the order tests will use them.",
+    )
+    group.addoption(
+        "--recording-preload-workers",
+        action="store",
+        type=int,
+        default=2,
+        help="Number of threads for preloading cassettes. Default to 2.",
+    )
+    group.addoption(
+        "--recording-journal",
+        action="store_true",
+        default=False,
+        help="Append interactions recorded into existing cassettes to sidecar journals instead of rewriting "
+        "the cassettes. Journals are compacted at the end of the session.",
+    )
+    group.addoption(
+        "--recording-track-usage",
+        action="store_true",
+        default=False,
+        help="Track which recorded interactions are replayed and report cassettes with unused ones.",
+    )
+    group.addoption(
+        "--recording-prune",
+        action="store_true",
+        default=False,
+        help="Remove interactions that were not replayed from cassettes at the end of the session. "
+        "Cassettes are pruned only if all tests were selected and passed, and none of them were skipped.",
+    )
+    group.addoption(
+        "--recording-keep-journal",
+        action="store_true",
+        default=False,
+        help="Do not compact cassette journals at the end of the session.",
+    )
+    group.addoption(
+        "--recording-preflight",
+        action="store_true",
+        default=False,
+        help="Check that cassettes of selected tests exist and could be loaded before running them. "
+        "The session fails if there are missing or unreadable cassettes.",
+    )
 
 
 def pytest_addhooks(pluginmanager: PytestPluginManager) -> None:
@@ -91,44 +632,47 @@ def vcr_config() -> Dict:
 @pytest.fixture  # type: ignore
 def allowed_hosts(request: SubRequest) -> List[str]:
     """List of regexes to match hosts to where connection must be allowed."""
-    block_network = request.node.get_closest_marker(name="block_network")
-    config = request.getfixturevalue("vcr_config")
     # Take `--allowed-hosts` with the most priority:
     #  - `block_network` mark
     #  - CLI option
     #  - `vcr_config` fixture
-    allowed_hosts = (
-        getattr(block_network, "kwargs", {}).get("allowed_hosts")
-        or request.config.getoption("--allowed-hosts")
-        or config.get("allowed_hosts")
-    )
-    if isinstance(allowed_hosts, str):
-        allowed_hosts = allowed_hosts.split(",")
+    allowed_hosts = get_plan(request.node).allowed_hosts
+    if not allowed_hosts:
+        allowed_hosts = request.getfixturevalue("vcr_config").get("allowed_hosts")
+        if isinstance(allowed_hosts, str):
+            allowed_hosts = allowed_hosts.split(",")
     return allowed_hosts
 
 
 @pytest.fixture  # type: ignore
 def vcr_markers(request: SubRequest) -> List[Mark]:
     """All markers applied to the certain test together with cassette names associated with each marker."""
-    return list(request.node.iter_markers(name="vcr"))
+    return list(get_plan(request.node).markers)
+
+
+@pytest.fixture  # type: ignore
+def recording_plan(request: SubRequest, vcr_markers: List[Mark]) -> RecordingPlan:
+    """Recording configuration of the test, resolved once and shared by the `block_network` and `vcr` fixtures."""
+    # `vcr_config` is not evaluated for tests without `vcr` marks
+    config = merge_kwargs(request.getfixturevalue("vcr_config"), vcr_markers) if vcr_markers else {}
+    return RecordingPlan(get_plan(request.node), config)
 
 
-@pytest.fixture(autouse=True)  # type: ignore
-def block_network(request: SubRequest, record_mode: str, vcr_markers: List[Mark]) -> Iterator[None]:
+@pytest.fixture  # type: ignore
+def block_network(
+    request: SubRequest, record_mode: str, vcr_markers: List[Mark], recording_plan: RecordingPlan
+) -> Iterator[None]:
     """Block network access in tests except for "none" VCR recording mode."""
-    block_network = request.node.get_closest_marker(name="block_network")
+    block_network = recording_plan.item.block_network
     if block_network is not None:
         validate_block_network_mark(block_network)
-    if vcr_markers:
-        # Take `record_mode` with the most priority:
-        #  - Explicit CLI option
-        #  - The `vcr_config` fixture
-        #  - The `vcr` mark
-        config = request.getfixturevalue("vcr_config")
-        merged_config = merge_kwargs(config, vcr_markers)
-        # If `--record-mode` was not explicitly passed in CLI, then take one from the merged config
-        if request.config.getoption("--record-mode") is None:
-            record_mode = merged_config.get("record_mode", "none")
+    # Take `record_mode` with the most priority:
+    #  - Explicit CLI option
+    #  - The `vcr_config` fixture
+    #  - The `vcr` mark
+    # If `--record-mode` was not explicitly passed in CLI, then take one from the merged config
+    if vcr_markers and request.config.getoption("--record-mode") is None:
+        record_mode = recording_plan.config.get("record_mode", "none")
     # If network blocking is enabled there is one exception - if VCR is in recording mode (any mode except "none")
     if (block_network or request.config.getoption("--block-network")) and (not vcr_markers or record_mode == "none"):
         allowed_hosts = request.getfixturevalue("allowed_hosts")
@@ -138,7 +682,7 @@ def block_network(request: SubRequest, record_mode: str, vcr_markers: List[Mark]
         yield
 
 
-@pytest.fixture(autouse=True)  # type: ignore
+@pytest.fixture  # type: ignore
 def vcr(
     request: SubRequest,
     vcr_markers: List[Mark],
@@ -153,15 +697,17 @@ def vcr(
     elif vcr_markers:
         from ._vcr import use_cassette
 
-        config = request.getfixturevalue("vcr_config")
+        plan = request.getfixturevalue("recording_plan")
         default_cassette = request.getfixturevalue("default_cassette_name")
         with use_cassette(
             default_cassette,
             vcr_cassette_dir,
             record_mode,
             vcr_markers,
-            config,
+            plan.config,
             pytestconfig,
+            nodeid=request.node.nodeid,
+            merged=True,
         ) as cassette:
             yield cassette
     else:
@@ -182,13 +728,11 @@ def vcr_cassette_dir(request: SubRequest) -> str:
 
 @pytest.fixture  # type: ignore
 def default_cassette_name(request: SubRequest) -> str:
-    marker = request.node.get_closest_marker("default_cassette")
-    if marker is not None:
-        assert marker.args, (
-            "You should pass the cassette name as an argument to the `pytest.mark.default_cassette` marker"
-        )
-        return marker.args[0]
-    return get_default_cassette_name(request.cls, request.node.name)
+    default_cassette = get_plan(request.node).default_cassette
+    assert default_cassette is not None, (
+        "You should pass the cassette name as an argument to the `pytest.mark.default_cassette` marker"
+    )
+    return default_cassette
 
 
 def get_default_cassette_name(test_class: Any, test_name: str) -> str:
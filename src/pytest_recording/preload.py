@@ -0,0 +1,82 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+# Cassettes used by each test in the execution order: node ID -> (cassette path, loading function)
+Plan = List[Tuple[str, List[Tuple[str, Callable[[], object]]]]]
+
+
+class Preloader:
+    """Load cassettes in background threads in the order they will be used by tests.
+
+    Loaded cassettes are stored in the cassette cache, and the total size of cassettes loaded for not yet finished
+    tests is bounded, so the preloader doesn't run too far ahead of tests and doesn't evict cassettes before
+    they are used.
+    """
+
+    def __init__(self, workers: int, budget: int) -> None:
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="pytest-recording-preload")
+        self._budget = budget
+        self._condition = threading.Condition()
+        self._reserved = 0
+        # Size of cassettes loaded for each test
+        self._reservations: Dict[str, int] = {}
+        self._futures: Dict[str, Future] = {}
+        self._finished: Set[str] = set()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, plan: Plan) -> None:
+        self._thread = threading.Thread(
+            target=self._schedule, args=(plan,), name="pytest-recording-preload-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def _schedule(self, plan: Plan) -> None:
+        for nodeid, cassettes in plan:
+            for path, load in cassettes:
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                with self._condition:
+                    while True:
+                        if self._closed:
+                            return
+                        if nodeid in self._finished or path in self._futures:
+                            # The test is already finished or the cassette is shared with another test
+                            break
+                        # A cassette larger than the budget is loaded when nothing else is reserved
+                        if not self._reserved or self._reserved + size <= self._budget:
+                            self._reserved += size
+                            self._reservations[nodeid] = self._reservations.get(nodeid, 0) + size
+                            self._futures[path] = self._executor.submit(load)
+                            break
+                        self._condition.wait()
+
+    def wait_for(self, path: str) -> None:
+        """Wait until the cassette is loaded if loading is in progress, otherwise don't load it in background."""
+        with self._condition:
+            future = self._futures.get(path)
+        if future is not None and not future.cancel():
+            try:
+                future.result()
+            except Exception:
+                # It will be loaded again by the test and the error will be reported there
+                pass
+
+    def release(self, nodeid: str) -> None:
+        """Free the space reserved for cassettes of a finished test."""
+        with self._condition:
+            self._finished.add(nodeid)
+            self._reserved -= self._reservations.pop(nodeid, 0)
+            self._condition.notify_all()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._thread is not None:
+            self._thread.join()
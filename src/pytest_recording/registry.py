@@ -0,0 +1,64 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Optional, Tuple
+
+from .utils import ConfigType
+
+if TYPE_CHECKING:
+    from vcr import VCR
+
+
+def freeze(value: Any) -> Hashable:
+    """Hashable representation of a configuration value.
+
+    Raises `TypeError` if the value contains unhashable objects.
+    """
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, set):
+        return frozenset(freeze(item) for item in value)
+    hash(value)
+    return value
+
+
+@dataclass
+class VCREntry:
+    vcr: "VCR"
+    # Whether each test should get its own persister, `False` if a hook registered a custom one
+    bind_persister: bool
+
+
+@dataclass
+class VCRRegistry:
+    """VCR instances and their resolved configurations shared by tests with the same settings."""
+
+    max_configs: int = 256
+    instances: Dict[Tuple, VCREntry] = field(default_factory=dict)
+    configs: "OrderedDict[Tuple, ConfigType]" = field(default_factory=OrderedDict)
+
+    def get_vcr(self, key: Tuple, factory: Callable[[], VCREntry]) -> VCREntry:
+        entry = self.instances.get(key)
+        if entry is None:
+            entry = self.instances[key] = factory()
+        return entry
+
+    def get_config(self, key: Tuple, entry: VCREntry, config: ConfigType) -> ConfigType:
+        """The result of `vcr.get_merged_config` for the given config without the per-test parts."""
+        try:
+            config_key: Optional[Tuple] = (key, freeze(config))
+        except TypeError:
+            config_key = None
+        if config_key is not None:
+            resolved = self.configs.get(config_key)
+            if resolved is not None:
+                self.configs.move_to_end(config_key)
+                return resolved
+        resolved = entry.vcr.get_merged_config(**config)
+        if config_key is not None:
+            self.configs[config_key] = resolved
+            if len(self.configs) > self.max_configs:
+                # E.g. if `vcr_config` creates new callbacks for every test
+                self.configs.popitem(last=False)
+        return resolved
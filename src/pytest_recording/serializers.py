@@ -0,0 +1,15 @@
+import yaml
+
+LIBYAML = "libyaml"
+PURE_PYTHON = "pure Python"
+
+
+def get_yaml_backend() -> str:
+    """YAML implementation used for cassettes.
+
+    VCR.py prefers `libyaml`-based loaders and dumpers if PyYAML is built with it, otherwise a 5-10x slower
+    pure Python implementation is used.
+    """
+    if getattr(yaml, "__with_libyaml__", False):
+        return LIBYAML
+    return PURE_PYTHON
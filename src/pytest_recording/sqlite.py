@@ -0,0 +1,184 @@
+"""Storage of cassettes in SQLite databases instead of separate files."""
+
+import json
+import os
+import sqlite3
+import threading
+from functools import partial
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from vcr.request import Request
+from vcr.serialize import deserialize
+from vcr.serializers import compat, jsonserializer, yamlserializer
+
+from . import jsonlserializer
+from .bodies import LazyBody, serialize
+from .storage import open_text, strip_compression_suffix, write_file
+
+SESSION_DATABASE_NAME = "cassettes.sqlite"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interactions (
+    cassette TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    request TEXT NOT NULL,
+    request_body BLOB,
+    response TEXT NOT NULL,
+    response_body BLOB,
+    PRIMARY KEY (cassette, position)
+) WITHOUT ROWID;
+"""
+# Suffixes of cassette files, possibly compressed
+SERIALIZERS = {
+    ".yaml": yamlserializer,
+    ".yml": yamlserializer,
+    ".json": jsonserializer,
+    ".jsonl": jsonlserializer,
+}
+
+
+def get_database_path(vcr_cassette_dir: str, scope: str, rootdir: str) -> str:
+    """Module-scoped databases are stored next to the module's cassette directory, e.g. `cassettes/test_api.sqlite`."""
+    if scope == "session":
+        return os.path.join(rootdir, SESSION_DATABASE_NAME)
+    return os.path.normpath(vcr_cassette_dir) + ".sqlite"
+
+
+class CassetteDatabase:
+    """Interactions of multiple cassettes in a single SQLite database.
+
+    Cassettes are identified by their file paths relative to the database directory, therefore the database could be
+    exported to the usual layout of cassette files and vice versa. Response bodies are read only when they are used.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        os.makedirs(self.root, exist_ok=True)
+        # Background writers use the same connection
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            # Allows concurrent readers, e.g. `pytest-xdist` workers
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(SCHEMA)
+
+    def get_name(self, path: str) -> Optional[str]:
+        """Name of the cassette with the given path, if it belongs to this database."""
+        name = os.path.relpath(os.path.abspath(path), self.root)
+        if name.startswith(os.pardir):
+            return None
+        return name.replace(os.sep, "/")
+
+    def names(self) -> List[str]:
+        with self._lock:
+            cursor = self._connection.execute("SELECT DISTINCT cassette FROM interactions ORDER BY cassette")
+            return [name for (name,) in cursor]
+
+    def load(self, name: str, lazy: bool = True) -> Tuple[List, List]:
+        """Recorded requests and responses of the given cassette in the recording order."""
+        columns = "position, request, request_body, response"
+        if not lazy:
+            columns += ", response_body"
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {columns} FROM interactions WHERE cassette = ? ORDER BY position",
+                (name,),
+            ).fetchall()
+        requests, responses = [], []
+        for position, request, request_body, response, *rest in rows:
+            request = json.loads(request)
+            request["body"] = request_body
+            requests.append(Request._from_dict(request))
+            response = json.loads(response)
+            if lazy:
+                response["body"] = LazyBody(partial(self._load_body, name, position), response["body"])
+            else:
+                response["body"]["string"] = rest[0]
+            responses.append(response)
+        return requests, responses
+
+    def _load_body(self, name: str, position: int) -> Dict[str, Any]:
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT response_body FROM interactions WHERE cassette = ? AND position = ?", (name, position)
+            )
+            row = cursor.fetchone()
+        return {"string": row[0] if row is not None else None}
+
+    def save(self, name: str, requests: Sequence, responses: Sequence) -> None:
+        """Replace all interactions of the given cassette."""
+        # Build rows first - lazy bodies from the same cassette should be read before they are deleted
+        rows = [
+            (name, position, *serialize_request(request), *serialize_response(response))
+            for position, (request, response) in enumerate(zip(requests, responses, strict=True))
+        ]
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.execute("DELETE FROM interactions WHERE cassette = ?", (name,))
+                self._connection.executemany("INSERT INTO interactions VALUES (?, ?, ?, ?, ?, ?)", rows)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def delete(self, name: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM interactions WHERE cassette = ?", (name,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def serialize_request(request: Request) -> Tuple[str, Any]:
+    data = compat.convert_to_unicode(request._to_dict())
+    body = data.pop("body")
+    return json.dumps(data), body
+
+
+def serialize_response(response: Dict[str, Any]) -> Tuple[str, Any]:
+    body = dict(response["body"])
+    string = body.pop("string", None)
+    return json.dumps({**response, "body": body}), string
+
+
+def get_serializer(path: str) -> Optional[ModuleType]:
+    _, suffix = os.path.splitext(strip_compression_suffix(path))
+    return SERIALIZERS.get(suffix)
+
+
+def iter_cassette_files(directory: str) -> Iterator[str]:
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if get_serializer(path) is not None:
+                yield path
+
+
+def import_cassettes(database: CassetteDatabase, directory: str) -> int:
+    """Store all cassette files from the given directory in the database."""
+    count = 0
+    for path in iter_cassette_files(directory):
+        name = database.get_name(path)
+        if name is None:
+            raise ValueError(f"{path} is outside of the database directory: {database.root}")
+        with open_text(path) as fd:
+            requests, responses = deserialize(fd.read(), get_serializer(path))
+        database.save(name, requests, responses)
+        count += 1
+    return count
+
+
+def export_cassettes(database: CassetteDatabase, directory: Optional[str] = None) -> int:
+    """Write all cassettes from the database as separate files, by default to the database directory."""
+    directory = directory or database.root
+    names = database.names()
+    for name in names:
+        path = os.path.join(directory, *name.split("/"))
+        requests, responses = database.load(name, lazy=False)
+        # Cassettes stored under not supported suffixes are written as YAML
+        serializer = get_serializer(path) or yamlserializer
+        write_file(path, serialize({"requests": requests, "responses": responses}, serializer))
+    return len(names)
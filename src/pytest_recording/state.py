@@ -0,0 +1,56 @@
+from dataclasses import dataclass, field
+from types import ModuleType
+from typing import TYPE_CHECKING, Dict, List, Optional, Set
+
+from _pytest.config import Config
+
+from .cache import CassetteCache, PersistentCache
+from .parallel import LoadingPool
+from .plan import ItemPlan
+from .preload import Preloader
+from .registry import VCRRegistry
+from .usage import PruneResult, UsageTracker
+from .writer import CassetteWriter
+
+if TYPE_CHECKING:
+    from .sqlite import CassetteDatabase
+
+
+@dataclass
+class RecordingState:
+    """Objects shared by all tests within a single session."""
+
+    cache: CassetteCache
+    persistent_cache: Optional[PersistentCache] = None
+    loading_pool: Optional[LoadingPool] = None
+    writer: Optional[CassetteWriter] = None
+    preloader: Optional[Preloader] = None
+    vcr_registry: VCRRegistry = field(default_factory=VCRRegistry)
+    # Whether VCR instances are shared by tests, decided on first use
+    reuse_vcr: Optional[bool] = None
+    # Opened SQLite databases by their paths
+    databases: Dict[str, "CassetteDatabase"] = field(default_factory=dict)
+    # Cassettes with journals written in this session and their serializers
+    journals: Dict[str, ModuleType] = field(default_factory=dict)
+    usage: Optional[UsageTracker] = None
+    # Whether some tests were deselected, e.g. via `-k`, so the usage is incomplete
+    deselected: bool = False
+    # Whether only a part of the test tree was selected via paths, node ids, `--deselect` or `--ignore`
+    partial: bool = False
+    # Whether some tests with `vcr` marks were skipped, xfailed or didn't finish the call phase
+    incomplete: bool = False
+    # Tests with `vcr` marks that finished the setup, but not the call phase yet
+    unfinished: Set[str] = field(default_factory=set)
+    pruned: List[PruneResult] = field(default_factory=list)
+    # Bytes saved by compaction of recorded interactions per cassette path
+    compaction_savings: Dict[str, int] = field(default_factory=dict)
+    # Recording configuration of collected tests by their node ids
+    plans: Dict[str, ItemPlan] = field(default_factory=dict)
+
+
+def get_state(config: Config) -> RecordingState:
+    return config._recording_state  # type: ignore[attr-defined]
+
+
+def set_state(config: Config, state: RecordingState) -> None:
+    config._recording_state = state  # type: ignore[attr-defined]
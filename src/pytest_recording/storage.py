@@ -0,0 +1,141 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import tempfile
+from types import ModuleType
+from typing import IO, Dict, Optional
+
+# Compression codecs and suffixes of cassettes compressed with them
+CODECS: Dict[str, ModuleType] = {"gzip": gzip, "lzma": lzma, "bz2": bz2}
+SUFFIXES = {"gzip": ".gz", "lzma": ".xz", "bz2": ".bz2"}
+
+
+def _get_umask() -> int:
+    # There is no way to read the umask without setting it
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Read once, since changing umask is not thread-safe
+UMASK = _get_umask()
+
+
+def get_codec(path: str) -> Optional[ModuleType]:
+    """Compression codec of the given file, based on its suffix."""
+    for name, suffix in SUFFIXES.items():
+        if path.endswith(suffix):
+            return CODECS[name]
+    return None
+
+
+def strip_compression_suffix(path: str) -> str:
+    for suffix in SUFFIXES.values():
+        if path.endswith(suffix):
+            return path[: -len(suffix)]
+    return path
+
+
+def resolve_path(path: str) -> str:
+    """Fall back to the uncompressed file if the compressed one does not exist yet.
+
+    It allows enabling compression for existing cassettes, they will be compressed when written next time.
+    """
+    uncompressed = strip_compression_suffix(path)
+    if uncompressed != path and not os.path.exists(path) and os.path.exists(uncompressed):
+        return uncompressed
+    return path
+
+
+def open_text(path: str) -> IO[str]:
+    """Open the file for reading, decompressing it on the fly if necessary."""
+    codec = get_codec(path)
+    if codec is None:
+        return open(path, encoding="utf8")
+    return codec.open(path, "rt", encoding="utf8")
+
+
+def decode(path: str, data: bytes) -> str:
+    """Decode the raw file content read from the given path."""
+    codec = get_codec(path)
+    if codec is not None:
+        data = codec.decompress(data)
+    # Universal newlines, the same as `open_text`
+    return io.TextIOWrapper(io.BytesIO(data), encoding="utf8").read()
+
+
+def encode(path: str, content: str) -> bytes:
+    data = content.encode("utf8")
+    codec = get_codec(path)
+    if codec is gzip:
+        # Without the timestamp in the header, the same content is compressed to the same bytes
+        return gzip.compress(data, mtime=0)
+    if codec is not None:
+        return codec.compress(data)
+    return data
+
+
+def write_file(path: str, content: str) -> bool:
+    """Atomically replace the file content unless it is already the same.
+
+    The content is compressed if the path has a suffix of one of the supported codecs.
+    Returns `True` if the file was written.
+    """
+    return write_bytes(path, encode(path, content))
+
+
+def append_file(path: str, content: str) -> bool:
+    """Append only the new part of the content if the file already has the rest of it, otherwise replace the file.
+
+    Appending is not atomic, therefore it is used only for formats that tolerate an incomplete last line.
+    Returns `True` if the file was written.
+    """
+    data = encode(path, content)
+    if get_codec(path) is None:
+        try:
+            with open(path, "rb") as fd:
+                existing = fd.read()
+        except OSError:
+            existing = None
+        if existing and len(existing) < len(data) and existing.endswith(b"\n") and data.startswith(existing):
+            with open(path, "ab") as fd:
+                fd.write(data[len(existing) :])
+            return True
+    return write_bytes(path, data)
+
+
+def write_bytes(path: str, data: bytes) -> bool:
+    """Atomically replace the file content unless it is already the same."""
+    if is_unchanged(path, data):
+        return False
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Not derived from the file name, which could be already as long as the file system allows
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".pytest-recording-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # `mkstemp` creates files readable only by the owner
+        os.chmod(tmp_path, 0o666 & ~UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+def is_unchanged(path: str, data: bytes) -> bool:
+    try:
+        # Files of a different size are not read at all
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, "rb") as fd:
+            existing = fd.read()
+    except OSError:
+        return False
+    return existing == data
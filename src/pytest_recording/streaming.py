@@ -0,0 +1,116 @@
+import io
+import mmap
+from functools import lru_cache
+from typing import Any, Optional, Tuple, Type, Union
+
+from vcr import stubs
+from vcr.stubs import VCRHTTPResponse
+
+from .blobs import BlobBody
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class ChunkedBody(io.RawIOBase):
+    """Read-only stream over a buffer that returns at most `chunk_size` bytes per read.
+
+    The buffer is not copied, and memory-mapped blobs are read page by page as the stream is consumed.
+    """
+
+    def __init__(self, source: Union[bytes, mmap.mmap], chunk_size: int) -> None:
+        super().__init__()
+        self._source = source
+        self._view = memoryview(source)
+        self._position = 0
+        self.chunk_size = chunk_size
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        if self.closed:
+            return 0
+        size = min(len(buffer), self.chunk_size, len(self._view) - self._position)
+        if size <= 0:
+            return 0
+        buffer[:size] = self._view[self._position : self._position + size]
+        self._position += size
+        return size
+
+    def readline(self, size: Optional[int] = -1) -> bytes:
+        if self.closed:
+            return b""
+        # Both `bytes` and `mmap` find the line end without copying the buffer
+        end = self._source.find(b"\n", self._position)
+        end = len(self._view) if end == -1 else end + 1
+        if size is not None and size >= 0:
+            end = min(end, self._position + size)
+        if end <= self._position:
+            return b""
+        line = self._view[self._position : end].tobytes()
+        self._position = end
+        return line
+
+    def read1(self, size: int = -1) -> bytes:
+        return self.read(size if size >= 0 else self.chunk_size) or b""
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(offset, 0)
+        return self._position
+
+    def tell(self) -> int:
+        return 0 if self.closed else self._position
+
+    def getbuffer(self) -> memoryview:
+        """The same as `io.BytesIO.getbuffer`, VCR uses it to get the body size."""
+        if self.closed:
+            # Clients might check `data` or `length_remaining` of closed responses
+            return memoryview(b"")
+        return self._view
+
+    def close(self) -> None:
+        """Release the buffer, e.g. unmap the blob. Called when the stream is garbage collected."""
+        if not self.closed:
+            self._view.release()
+            if isinstance(self._source, mmap.mmap):
+                self._source.close()
+        super().close()
+
+
+class StreamingVCRHTTPResponse(VCRHTTPResponse):
+    """Replayed response that gives its body to the client in chunks instead of a single bytes object."""
+
+    chunk_size = DEFAULT_CHUNK_SIZE
+
+    def __init__(self, recorded_response: Any, request_url: Optional[str] = None) -> None:
+        body = recorded_response["body"]
+        # The parent class copies the whole body into memory
+        super().__init__({**recorded_response, "body": {"string": b""}}, request_url)
+        self.recorded_response = recorded_response
+        # Not closed together with the response, the same as in VCR, because clients use `data` after closing it.
+        # The buffer is released when the last reference to the stream is gone
+        self._content = ChunkedBody(get_source(body), self.chunk_size)
+
+
+def get_source(body: Any) -> Union[bytes, mmap.mmap]:
+    if isinstance(body, BlobBody) and not body.is_loaded:
+        # The body is not loaded into memory at all
+        return body.open()
+    return body["string"] or b""
+
+
+@lru_cache
+def get_streaming_patch(chunk_size: int) -> Tuple[Any, str, Type[VCRHTTPResponse]]:
+    """A patch for VCR's `custom_patches` that replaces the response stub for `http.client`-based clients.
+
+    Cached to have the same value for the same chunk size, so VCR configurations with it could be reused.
+    """
+    response_class = type(StreamingVCRHTTPResponse.__name__, (StreamingVCRHTTPResponse,), {"chunk_size": chunk_size})
+    return stubs, "VCRHTTPResponse", response_class
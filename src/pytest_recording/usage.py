@@ -0,0 +1,88 @@
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Set
+
+
+@dataclass
+class CassetteUsage:
+    # Name of the serializer module
+    serializer: str
+    # Number of interactions in the cassette when it was loaded
+    size: int
+    # Positions of replayed interactions
+    used: Set[int] = field(default_factory=set)
+
+
+@dataclass
+class PruneResult:
+    path: str
+    removed: int
+    total: int
+    saved_bytes: int
+
+
+class UsageTracker:
+    """Interactions replayed from each cassette during the session.
+
+    Cassettes that were written during the session or loaded with different sizes are not tracked, since positions
+    of their interactions are not reliable anymore.
+    """
+
+    def __init__(self) -> None:
+        self.cassettes: Dict[str, CassetteUsage] = {}
+        self.modified: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def add(self, path: str, serializer: str, size: int, used: Iterable[int]) -> None:
+        path = os.path.abspath(path)
+        with self._lock:
+            usage = self.cassettes.get(path)
+            if usage is None:
+                usage = self.cassettes[path] = CassetteUsage(serializer, size)
+            elif usage.size != size or usage.serializer != serializer:
+                self.modified.add(path)
+            usage.used.update(used)
+
+    def mark_modified(self, path: str) -> None:
+        with self._lock:
+            self.modified.add(os.path.abspath(path))
+
+    def get_unused(self) -> Dict[str, CassetteUsage]:
+        """Cassettes that have interactions not replayed by any test."""
+        return {
+            path: usage
+            for path, usage in self.cassettes.items()
+            if path not in self.modified and len(usage.used) < usage.size
+        }
+
+    def dump(self) -> Dict[str, Any]:
+        """JSON-serializable data, e.g. to send it from `pytest-xdist` workers."""
+        with self._lock:
+            return {
+                "cassettes": {
+                    path: [usage.serializer, usage.size, sorted(usage.used)] for path, usage in self.cassettes.items()
+                },
+                "modified": sorted(self.modified),
+            }
+
+    def merge(self, data: Dict[str, Any]) -> None:
+        for path, (serializer, size, used) in data["cassettes"].items():
+            self.add(path, serializer, size, used)
+        with self._lock:
+            self.modified.update(data["modified"])
+
+
+def format_results(results: List[PruneResult]) -> List[str]:
+    lines = [
+        "{}: removed {} of {} interactions, {} bytes".format(
+            result.path, result.removed, result.total, result.saved_bytes
+        )
+        for result in results
+    ]
+    lines.append(
+        "Pruned {} interactions, {} bytes in total".format(
+            sum(result.removed for result in results), sum(result.saved_bytes for result in results)
+        )
+    )
+    return lines
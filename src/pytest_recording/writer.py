@@ -0,0 +1,77 @@
+import os
+import queue
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+Task = Tuple[str, Callable[[], None], str]
+
+
+@dataclass
+class WriteError:
+    path: str
+    nodeid: str
+    error: Exception
+
+
+class CassetteWriter:
+    """Serialize and write cassettes in background threads.
+
+    The number of queued cassettes is bounded, so tests are blocked if workers can not keep up. Readers should call
+    `wait_for` before reading a cassette to not observe its previous version.
+    """
+
+    def __init__(self, workers: int, max_queued: Optional[int] = None) -> None:
+        self._queue: "queue.Queue[Optional[Task]]" = queue.Queue(maxsize=max_queued or workers * 4)
+        self._condition = threading.Condition()
+        # Number of not finished writes per path
+        self._pending: Dict[str, int] = {}
+        self.errors: List[WriteError] = []
+        self._threads = [
+            threading.Thread(target=self._work, name="pytest-recording-writer-{}".format(idx), daemon=True)
+            for idx in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, path: str, write: Callable[[], None], nodeid: str) -> None:
+        path = os.path.abspath(path)
+        with self._condition:
+            self._pending[path] = self._pending.get(path, 0) + 1
+        self._queue.put((path, write, nodeid))
+
+    def wait_for(self, path: str) -> None:
+        """Block until all pending writes to the given path are finished."""
+        path = os.path.abspath(path)
+        with self._condition:
+            while self._pending.get(path):
+                self._condition.wait()
+
+    def flush(self) -> None:
+        self._queue.join()
+
+    def close(self) -> None:
+        self.flush()
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+    def _work(self) -> None:
+        while True:
+            task = self._queue.get()
+            if task is None:
+                self._queue.task_done()
+                return
+            path, write, nodeid = task
+            try:
+                write()
+            except Exception as exc:
+                self.errors.append(WriteError(path, nodeid, exc))
+            finally:
+                with self._condition:
+                    self._pending[path] -= 1
+                    if not self._pending[path]:
+                        del self._pending[path]
+                    self._condition.notify_all()
+                self._queue.task_done()
@@ -1,5 +1,10 @@
 import pytest
 
+# `pytester` unloads modules imported during in-process runs, but some of them can not be imported again
+# in the same process (e.g. due to C extensions), therefore they are imported here once
+import requests  # noqa: F401
+import vcr  # noqa: F401
+
 pytest_plugins = "pytester"
 
 
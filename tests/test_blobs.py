@@ -0,0 +1,146 @@
+import copy
+
+import pytest
+
+from pytest_recording.blobs import BlobBody, BlobStore
+from pytest_recording.cache import CassetteCache
+
+
+def test_externalize(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=5)
+    responses = [
+        {"body": {"string": b"tiny"}},
+        {"body": {"string": "large body"}},
+        {"body": {"string": b"large body"}},
+    ]
+    externalized = store.externalize(responses)
+    # Then only bodies above the threshold are replaced
+    assert externalized[0] is responses[0]
+    assert externalized[1]["body"] == externalized[2]["body"] == {"sha256": store.put(b"large body")}
+    # And the original responses are not modified
+    assert responses[1]["body"] == {"string": "large body"}
+    # And identical bodies are stored once
+    assert len(list(tmp_path.glob("*/*"))) == 1
+    # When references are resolved with an empty cache
+    other = BlobStore(str(tmp_path), threshold=5)
+    other.resolve(externalized)
+    # Then all duplicates share the same content
+    assert externalized[1]["body"]["string"] == b"large body"
+    assert externalized[1]["body"]["string"] is externalized[2]["body"]["string"]
+
+
+def test_cached_blobs(tmp_path):
+    cache = CassetteCache(max_size=25)
+    store = BlobStore(str(tmp_path), threshold=5, cache=cache.blobs)
+    digest = store.put(b"large body")
+    # Recorded blobs are not kept in memory
+    assert not cache.blobs
+    for name in ("a.yaml", "b.yaml"):
+        responses = [{"body": {"sha256": digest}}]
+        cache.set(name, "yaml", (0, 0), [], responses, 10, store.resolve(responses))
+    # Blobs of cached cassettes are shared
+    assert cache.blobs == {digest: b"large body"}
+    responses = [{"body": {"sha256": digest}}]
+    store.resolve(responses)
+    assert responses[0]["body"]["string"] is cache.blobs[digest]
+    # And they are dropped together with the last cassette that uses them
+    cache.invalidate("a.yaml")
+    assert digest in cache.blobs
+    cache.set("c.yaml", "yaml", (0, 0), [], [], 20)
+    assert cache.evictions == 1
+    assert not cache.blobs
+
+
+def test_missing_blob(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=5)
+    with pytest.raises(FileNotFoundError, match="Response body blob 0000 is not found"):
+        store.resolve([{"body": {"sha256": "0000"}}])
+
+
+def test_lazy_blobs(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=5, lazy=True)
+    responses = store.externalize([{"body": {"string": b"large body"}}])
+    # When blobs are resolved lazily
+    store.resolve(responses)
+    body = responses[0]["body"]
+    assert isinstance(body, BlobBody)
+    # Then they are not read
+    assert not body.is_loaded
+    assert not store.cache
+    # Including copies made by VCR
+    copied = copy.deepcopy(body)
+    assert isinstance(copied, BlobBody)
+    assert not copied.is_loaded
+    # And not replayed bodies are saved as references without reading them
+    assert store.externalize(responses) == [{"body": {"sha256": body.digest}}]
+    assert not body.is_loaded
+    # Until they are accessed
+    assert copied["string"] == b"large body"
+    with body.open() as mapped:
+        assert mapped[:5] == b"large"
+
+
+def test_blob_storage(testdir, httpbin):
+    testdir.makeini(
+        """
+[pytest]
+recording_blob_threshold = 1
+    """
+    )
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr
+@pytest.mark.parametrize("idx", (1, 2))
+def test_feature(idx):
+    assert requests.get("{}/range/2048").content == b"abcdefghijklmnopqrstuvwxyz" * 78 + b"abcdefghijklmnopqrst"
+    """.format(httpbin.url)
+    )
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=2)
+    # Then the body is stored once
+    assert len(testdir.tmpdir.join("cassettes/blobs").listdir()) == 1
+    cassette = testdir.tmpdir.join("cassettes/test_blob_storage/test_feature[1].yaml").read()
+    assert "sha256:" in cassette
+    assert "abcdef" not in cassette
+    # And cassettes are replayed
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=2)
+
+
+def test_mmap_blobs(testdir, httpbin):
+    testdir.makeini(
+        """
+[pytest]
+recording_blob_threshold = 1
+recording_blob_mmap = true
+    """
+    )
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_feature():
+    assert len(requests.get("{0}/range/2048").content) == 2048
+    assert len(requests.get("{0}/range/4096").content) == 4096
+    """.format(httpbin.url)
+    )
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=1)
+    assert len(testdir.tmpdir.join("cassettes/blobs").listdir()) == 2
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=1)
+    # When the cassette is extended, blobs are kept
+    testdir.runpytest("--record-mode=all").assert_outcomes(passed=1)
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=1)
+
+
+def test_invalid_blob_threshold(testdir):
+    testdir.makeini(
+        """
+[pytest]
+recording_blob_threshold = large
+    """
+    )
+    result = testdir.runpytest()
+    result.stderr.fnmatch_lines(["ERROR: Invalid `recording_blob_threshold` value: 'large'*"])
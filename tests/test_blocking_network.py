@@ -8,7 +8,7 @@ import requests
 import vcr.errors
 from packaging import version
 
-from pytest_recording.network import blocking_context
+from pytest_recording.network import blocking_context, compile_allowed_hosts, is_host_in_allowed_hosts
 
 # Windows doesn’t have AF_NETLINK & AF_UNIX
 try:
@@ -450,3 +450,13 @@ def test_request():
         result.assert_outcomes(error=1)
     expected = "Invalid arguments to `block_network`. It accepts only the following keyword arguments: `allowed_hosts`."
     assert expected in result.stdout.str()
+
+
+def test_compiled_allowed_hosts():
+    # Tests with the same allowed hosts share the compiled regex
+    pattern = compile_allowed_hosts(("httpbin.*", "127.0.0.1"))
+    assert compile_allowed_hosts(("httpbin.*", "127.0.0.1")) is pattern
+    assert is_host_in_allowed_hosts("httpbin.org", pattern)
+    assert is_host_in_allowed_hosts(b"127.0.0.1", ["httpbin.*", "127.0.0.1"])
+    assert not is_host_in_allowed_hosts("example.com", pattern)
+    assert not is_host_in_allowed_hosts("httpbin.org", None)
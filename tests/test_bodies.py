@@ -0,0 +1,134 @@
+import pickle
+
+import pytest
+import yaml
+from vcr import matchers
+from vcr.matchers import requests_match
+from vcr.request import Request
+from vcr.serializers import jsonserializer, yamlserializer
+
+from pytest_recording import jsonlserializer
+from pytest_recording.bodies import LAZY_THRESHOLD, LazyBody, LazyRequest, deserialize, serialize
+
+LARGE = "x" * LAZY_THRESHOLD
+CASSETTE = {
+    "version": 1,
+    "interactions": [
+        {
+            "request": {"body": LARGE, "headers": {}, "method": "POST", "uri": "http://httpbin.org/post"},
+            "response": {"body": {"string": LARGE}, "headers": {}, "status": {"code": 200, "message": "OK"}},
+        },
+        {
+            "request": {"body": None, "headers": {}, "method": "GET", "uri": "http://httpbin.org/get"},
+            "response": {"body": {"string": "small"}, "headers": {}, "status": {"code": 200, "message": "OK"}},
+        },
+    ],
+}
+
+
+@pytest.mark.parametrize("serializer", (yamlserializer, jsonserializer, jsonlserializer))
+def test_deserialize(serializer):
+    requests, responses = deserialize(serializer.serialize(CASSETTE), serializer)
+    # Large bodies are not encoded upfront
+    assert isinstance(responses[0]["body"], LazyBody)
+    assert not responses[0]["body"].is_loaded
+    assert requests[0]._raw_body == LARGE
+    # Small ones are encoded right away
+    assert responses[1]["body"] == {"string": b"small"}
+    # And the values are the same as VCR gives
+    assert requests[0].body == LARGE.encode()
+    assert responses[0]["body"]["string"] == LARGE.encode()
+    assert requests[1].body is None
+
+
+def test_matching_without_body():
+    request = LazyRequest("POST", "http://httpbin.org/post", LARGE, {})
+    other = Request("POST", "http://httpbin.org/post", LARGE, {})
+    # The body is not encoded if it is not matched
+    assert requests_match(other, request, [matchers.method, matchers.uri])
+    assert request._raw_body is not None
+    # But it is when it is needed
+    assert requests_match(other, request, [matchers.body])
+    assert request._raw_body is None
+
+
+def test_lazy_request():
+    request = LazyRequest("POST", "http://httpbin.org/post", "content", {"Accept": ["*/*"]})
+    assert request._to_dict() == Request("POST", "http://httpbin.org/post", "content", {"Accept": ["*/*"]})._to_dict()
+    # Assigned bodies replace the recorded one
+    request = LazyRequest("POST", "http://httpbin.org/post", "content", {})
+    request.body = "other"
+    assert request.body == b"other"
+    assert pickle.loads(pickle.dumps(request)).body == b"other"
+
+
+def test_binary_jsonl_body():
+    cassette = {
+        **CASSETTE,
+        "interactions": [
+            {
+                **CASSETTE["interactions"][1],
+                "response": {**CASSETTE["interactions"][1]["response"], "body": {"string": b"\x89PNG"}},
+            }
+        ],
+    }
+    _, responses = deserialize(jsonlserializer.serialize(cassette), jsonlserializer)
+    # Base64 is decoded only on first access
+    assert not responses[0]["body"].is_loaded
+    assert responses[0]["body"]["string"] == b"\x89PNG"
+
+
+def test_not_equal():
+    body = LazyBody(lambda: {"string": b"content"})
+    # Comparison loads the body first
+    assert not body != {"string": b"content"}
+    assert body != {"string": b"other"}
+
+
+def test_serialize_does_not_modify_responses():
+    response = {"body": {"string": b"content"}, "headers": {}, "status": {"code": 200, "message": "OK"}}
+    lazy = {**response, "body": LazyBody(lambda: {"string": b"lazy"})}
+    request = Request("GET", "http://httpbin.org/get", None, {})
+    data = serialize({"requests": [request, request], "responses": [response, lazy]}, yamlserializer)
+    assert [interaction["response"]["body"]["string"] for interaction in yaml.safe_load(data)["interactions"]] == [
+        "content",
+        "lazy",
+    ]
+    assert response["body"]["string"] == b"content"
+    assert isinstance(lazy["body"], LazyBody)
+
+
+@pytest.mark.parametrize("args", ((), ("--recording-journal",)))
+def test_rerecord_large_body(testdir, httpbin, args):
+    # When a cassette has a body that is decoded lazily
+    testdir.makepyfile(
+        f"""
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_feature():
+    assert len(requests.get("{httpbin.url}/range/{LAZY_THRESHOLD * 2}").text) == {LAZY_THRESHOLD * 2}
+    """
+    )
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=1)
+    testdir.makepyfile(
+        f"""
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_feature():
+    assert len(requests.get("{httpbin.url}/range/{LAZY_THRESHOLD * 2}").text) == {LAZY_THRESHOLD * 2}
+    assert requests.get("{httpbin.url}/ip").status_code == 200
+    """
+    )
+    # Then it could be written again with new interactions
+    testdir.runpytest("--record-mode=new_episodes", *args).assert_outcomes(passed=1)
+    cassette = testdir.tmpdir.join("cassettes/test_rerecord_large_body/test_feature.yaml")
+    with open(str(cassette)) as fd:
+        interactions = yaml.safe_load(fd)["interactions"]
+    assert len(interactions) == 2
+    assert len(interactions[0]["response"]["body"]["string"]) == LAZY_THRESHOLD * 2
+    assert not testdir.tmpdir.join("cassettes/test_rerecord_large_body/test_feature.yaml.journal").exists()
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=1)
@@ -0,0 +1,224 @@
+import gzip
+import marshal
+import os
+import pickle
+
+import pytest
+from vcr.serializers import yamlserializer as serializer
+
+from pytest_recording import jsonlserializer
+from pytest_recording._vcr import load_cassette, read_cassette_file
+from pytest_recording.bodies import LAZY_THRESHOLD
+from pytest_recording.cache import CassetteCache, PersistentCache, get_signature
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    path = tmp_path / "cassette.yaml"
+    path.write_text("x" * 10)
+    return str(path)
+
+
+def test_hit(cassette):
+    cache = CassetteCache(max_size=100)
+    signature = get_signature(cassette)
+    assert cache.get(cassette, "yaml", signature) is None
+    cache.set(cassette, "yaml", signature, [1], [2], 10)
+    assert cache.get(cassette, "yaml", signature) == ([1], [2])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_changed_file(cassette):
+    # When the cassette is rewritten after it was cached
+    cache = CassetteCache(max_size=100)
+    cache.set(cassette, "yaml", get_signature(cassette), [1], [2], 10)
+    with open(cassette, "w") as fd:
+        fd.write("y" * 20)
+    # Then the stale entry should not be used
+    assert cache.get(cassette, "yaml", get_signature(cassette)) is None
+    assert cache.size == 0
+
+
+def test_lru_eviction(tmp_path):
+    cache = CassetteCache(max_size=25)
+    paths = []
+    for name in "abc":
+        path = tmp_path / name
+        path.write_text("x" * 10)
+        paths.append(str(path))
+    first, second, third = paths
+    cache.set(first, "yaml", get_signature(first), [], [], 10)
+    cache.set(second, "yaml", get_signature(second), [], [], 10)
+    # The first one becomes the most recently used
+    assert cache.get(first, "yaml", get_signature(first)) is not None
+    cache.set(third, "yaml", get_signature(third), [], [], 10)
+    assert cache.get(second, "yaml", get_signature(second)) is None
+    assert cache.get(first, "yaml", get_signature(first)) is not None
+    assert cache.evictions == 1
+    assert cache.size == 20
+
+
+def test_invalidate(cassette):
+    cache = CassetteCache(max_size=100)
+    cache.set(cassette, "yaml", get_signature(cassette), [], [], 10)
+    cache.invalidate(cassette)
+    assert cache.get(cassette, "yaml", get_signature(cassette)) is None
+
+
+def test_content_size(tmp_path, get_cassette):
+    # Compressed cassettes are measured by their content, not by their size on disk
+    body = "x" * LAZY_THRESHOLD * 10
+    path = tmp_path / "cassette.yaml.gz"
+    path.write_bytes(gzip.compress(get_cassette.replace('{"get": true}', body).encode()))
+    cache = CassetteCache(max_size=1024 * 1024)
+    _, responses = load_cassette(str(path), serializer, cache)
+    assert cache.size >= len(body) > path.stat().st_size
+    # Lazy bodies are not loaded to measure them
+    assert not responses[0]["body"].is_loaded
+
+
+def test_load_cassette(get_response_cassette):
+    cache = CassetteCache(max_size=1024)
+    path = str(get_response_cassette)
+    requests, responses = load_cassette(path, serializer, cache)
+    assert load_cassette(path, serializer, cache) == (requests, responses)
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Missing files are not cached
+    assert load_cassette(path + ".missing", serializer, cache) == ([], [])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_shared_cassette(testdir, get_response_cassette):
+    # When multiple tests use the same extra cassette
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr(r"{0}")
+def test_first():
+    assert requests.get("http://httpbin.org/get").text == '{{"get": true}}'
+
+@pytest.mark.vcr(r"{0}")
+def test_second():
+    assert requests.get("http://httpbin.org/get").text == '{{"get": true}}'
+""".format(get_response_cassette)
+    )
+    result = testdir.runpytest()
+    result.assert_outcomes(passed=2)
+    # Then it should be parsed only once
+    result.stdout.fnmatch_lines(["Cassette cache: 1 hits, 1 misses, 0 evictions"])
+
+
+def test_disabled_cache(testdir, get_response_cassette):
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr(r"{}")
+def test_first():
+    assert requests.get("http://httpbin.org/get").text == '{{"get": true}}'
+""".format(get_response_cassette)
+    )
+    result = testdir.runpytest("--recording-cache-size=0")
+    result.assert_outcomes(passed=1)
+    assert "Cassette cache" not in result.stdout.str()
+
+
+INTERACTIONS = [
+    {
+        "request": {"method": "GET", "uri": "http://httpbin.org/get", "body": None, "headers": {}},
+        "response": {"status": {"code": 200, "message": "OK"}, "headers": {}, "body": {"string": b"{}"}},
+    }
+]
+
+
+def test_persistent_cache(tmp_path):
+    cache = PersistentCache(str(tmp_path), version="1")
+    assert cache.get(b"content", serializer) is None
+    cache.set(b"content", serializer, INTERACTIONS)
+    assert cache.get(b"content", serializer) == INTERACTIONS
+    # Different content or plugin version are different entries
+    assert cache.get(b"other", serializer) is None
+    assert PersistentCache(str(tmp_path), version="2").get(b"content", serializer) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+@pytest.mark.parametrize("data", (b"garbage", marshal.dumps({"not": "a list"})))
+def test_persistent_cache_broken_entry(tmp_path, data):
+    cache = PersistentCache(str(tmp_path))
+    with open(cache.get_path(b"content", serializer), "wb") as fd:
+        fd.write(data)
+    assert cache.get(b"content", serializer) is None
+
+
+def test_persistent_cache_pickle(tmp_path):
+    # Entries are never unpickled, so they can not run code
+    cache = PersistentCache(str(tmp_path))
+    with open(cache.get_path(b"content", serializer), "wb") as fd:
+        fd.write(pickle.dumps(INTERACTIONS))
+    assert cache.get(b"content", serializer) is None
+
+
+def test_persistent_cache_unsupported_types(tmp_path):
+    cache = PersistentCache(str(tmp_path))
+    cache.set(b"content", serializer, [{"request": {"body": (item for item in [])}}])
+    assert not os.listdir(str(tmp_path))
+
+
+def test_persistent_cache_lazy_bodies(tmp_path):
+    # Lazy bodies of JSON Lines cassettes are stored as plain data
+    path = tmp_path / "cassette.jsonl"
+    path.write_text(jsonlserializer.serialize({"version": 1, "interactions": INTERACTIONS}))
+    cache = PersistentCache(str(tmp_path / "cache"))
+    os.mkdir(cache.directory)
+    expected = read_cassette_file(str(path), jsonlserializer, cache)
+    requests, responses = read_cassette_file(str(path), jsonlserializer, cache)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert [request._to_dict() for request in requests] == [request._to_dict() for request in expected[0]]
+    assert responses == expected[1]
+
+
+def test_persistent_cache_prune(tmp_path):
+    old = PersistentCache(str(tmp_path))
+    old.set(b"old", serializer, [])
+    old.set(b"used", serializer, [])
+    os.utime(old.get_path(b"old", serializer), (0, 0))
+    os.utime(old.get_path(b"used", serializer), (0, 0))
+    cache = PersistentCache(str(tmp_path))
+    assert cache.get(b"used", serializer) == []
+    # Then only the entry that was not used during the session is removed
+    assert cache.prune() == 1
+    assert os.listdir(str(tmp_path)) == [os.path.basename(cache.get_path(b"used", serializer))]
+
+
+def test_persistent_cache_across_runs(testdir, get_response_cassette):
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr(r"{}")
+def test_first():
+    assert requests.get("http://httpbin.org/get").text == '{{"get": true}}'
+""".format(get_response_cassette)
+    )
+    result = testdir.runpytest("--recording-persistent-cache")
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["Persistent cassette cache: 0 hits, 1 misses"])
+    # When the same cassette is loaded in the next run
+    result = testdir.runpytest("--recording-persistent-cache", "--recording-prune-cache")
+    result.assert_outcomes(passed=1)
+    # Then it is taken from the cache
+    result.stdout.fnmatch_lines(["Persistent cassette cache: 1 hits, 0 misses"])
+    assert len(testdir.tmpdir.join(".pytest_cache/d/recording").listdir()) == 1
+
+
+def test_persistent_cache_without_cacheprovider(testdir):
+    testdir.makepyfile("def test_(): pass")
+    result = testdir.runpytest("-p", "no:cacheprovider", "--recording-persistent-cache")
+    # Then a usage error is reported instead of an internal one
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines(["ERROR: `--recording-persistent-cache` requires the pytest cache*"])
+    assert "INTERNALERROR" not in result.stdout.str() + result.stderr.str()
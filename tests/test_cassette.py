@@ -0,0 +1,149 @@
+import pytest
+from vcr import matchers
+from vcr.cassette import Cassette
+from vcr.errors import UnhandledHTTPRequestError
+from vcr.request import Request
+
+import pytest_recording.cassette
+from pytest_recording.cassette import IndexedCassette
+
+RECORDED = [
+    ("GET", "http://example.com/a"),
+    ("GET", "http://example.com/b"),
+    ("GET", "http://example.com/a?x=1"),
+    ("POST", "http://example.com/a"),
+    ("GET", "http://example.com/a"),
+    ("GET", "https://example.com:8443/a"),
+    ("GET", "http://other.com/a"),
+]
+INCOMING = [
+    ("GET", "http://example.com/a"),
+    ("GET", "http://example.com/a"),
+    ("GET", "http://example.com/a"),
+    ("GET", "http://example.com/a?x=1"),
+    ("POST", "http://example.com/a"),
+    ("GET", "https://example.com:8443/a"),
+    ("GET", "http://other.com/a"),
+    ("DELETE", "http://other.com/a"),
+]
+
+
+def make_cassette(cls, **kwargs):
+    cassette = cls("path", **kwargs)
+    for position, (method, uri) in enumerate(RECORDED):
+        cassette.append(Request(method, uri, None, {}), {"position": position})
+    return cassette
+
+
+def play_all(cassette):
+    results = []
+    for method, uri in INCOMING:
+        try:
+            results.append(cassette.play_response(Request(method, uri, None, {}))["position"])
+        except UnhandledHTTPRequestError:
+            results.append(None)
+    return results
+
+
+def query_matcher(r1, r2):
+    assert r1.query == r2.query
+
+
+@pytest.mark.parametrize(
+    "match_on",
+    (
+        (matchers.uri, matchers.method),
+        (matchers.method, matchers.scheme, matchers.host, matchers.port, matchers.path, matchers.query),
+        (matchers.host, query_matcher),
+        (query_matcher,),
+    ),
+)
+@pytest.mark.parametrize("allow_playback_repeats", (True, False))
+def test_same_as_linear_scan(match_on, allow_playback_repeats):
+    # When requests are looked up via the index
+    kwargs = {"match_on": match_on, "allow_playback_repeats": allow_playback_repeats}
+    indexed = make_cassette(IndexedCassette, **kwargs)
+    linear = make_cassette(Cassette, **kwargs)
+    # Then the results and their order should be the same as for the linear scan
+    assert play_all(indexed) == play_all(linear)
+    assert indexed.play_counts == linear.play_counts
+
+
+def test_filtered_requests_are_not_indexed():
+    cassette = IndexedCassette(
+        "path", before_record_request=lambda request: None if request.path == "/skip" else request
+    )
+    cassette.append(Request("GET", "http://example.com/skip", None, {}), {})
+    cassette.append(Request("GET", "http://example.com/a", None, {}), {"position": 0})
+    assert len(cassette) == 1
+    assert cassette.play_response(Request("GET", "http://example.com/a", None, {})) == {"position": 0}
+
+
+def test_cassette_class(testdir, create_file, get_cassette):
+    # When a test uses a cassette
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+import pytest_recording.cassette
+from pytest_recording.cassette import IndexedCassette
+
+@pytest.mark.vcr
+def test_feature(vcr):
+    assert isinstance(vcr, IndexedCassette)
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+    assert vcr.play_count == 1
+    """
+    )
+    create_file("cassettes/test_cassette_class/test_feature.yaml", get_cassette)
+    # Then requests should be looked up via the index
+    result = testdir.runpytest()
+    result.assert_outcomes(passed=1)
+
+
+def test_near_miss_diagnostics(mocker):
+    cassette = IndexedCassette("path", match_on=(matchers.method, matchers.uri))
+    for idx in range(1000):
+        cassette.append(Request("GET", f"http://example.com/items/{idx}", None, {}), {})
+        cassette.append(Request("POST", f"http://example.com/items/{idx}", None, {}), {})
+    cassette.append(Request("GET", "http://other.com/items/5", None, {}), {})
+    spy = mocker.spy(matchers, "get_matchers_results")
+    # When a request has no match
+    best_matches = cassette.find_requests_with_most_matches(Request("GET", "http://example.com/items/5?x=1", None, {}))
+    # Then only a limited number of similar requests is checked, the most similar first
+    assert spy.call_count == 50
+    assert [str(match[0]) for match in best_matches][:1] == ["<Request (GET) http://example.com/items/5>"]
+    assert all(match[1] == ["method"] for match in best_matches)
+    # And the error message is produced quickly
+    with pytest.raises(UnhandledHTTPRequestError):
+        cassette.play_response(Request("GET", "http://example.com/items/5?x=1", None, {}))
+
+
+def test_near_miss_diagnostics_small_cassette():
+    # For small cassettes the results are the same as in VCR
+    request = Request("GET", "http://example.com/a?x=2", None, {})
+    kwargs = {"match_on": (matchers.method, matchers.uri, matchers.host)}
+    indexed = make_cassette(IndexedCassette, **kwargs)
+    linear = make_cassette(Cassette, **kwargs)
+    assert [str(match[0]) for match in indexed.find_requests_with_most_matches(request)] == [
+        str(match[0]) for match in linear.find_requests_with_most_matches(request)
+    ]
+
+
+def test_repeated_requests(mocker):
+    cassette = IndexedCassette("path", match_on=(matchers.method, matchers.uri, query_matcher))
+    for position in range(500):
+        cassette.append(Request("GET", "http://example.com/status", None, {}), {"position": position})
+    spy = mocker.spy(pytest_recording.cassette, "requests_match")
+    request = Request("GET", "http://example.com/status", None, {})
+    # When the same request is replayed many times
+    assert [cassette.play_response(request)["position"] for _ in range(500)] == list(range(500))
+    # Then already played requests are not checked again
+    assert spy.call_count == 500
+    with pytest.raises(UnhandledHTTPRequestError):
+        cassette.play_response(request)
+    # But they are still returned by `responses_of`
+    assert len(cassette.responses_of(request)) == 500
+    # And could be played again after rewinding
+    cassette.rewind()
+    assert cassette.play_response(request) == {"position": 0}
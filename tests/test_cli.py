@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+from pytest_recording.bodies import LAZY_THRESHOLD
+from pytest_recording.cli import load, main
+
+
+@pytest.fixture
+def cassettes(tmp_path, get_cassette, ip_cassette):
+    directory = tmp_path / "cassettes"
+    (directory / "test_api").mkdir(parents=True)
+    (directory / "test_api" / "test_get.yaml").write_text(get_cassette)
+    (directory / "test_api" / "test_ip.yaml").write_text(ip_cassette)
+    return directory
+
+
+def run(*args):
+    with pytest.raises(SystemExit) as exc:
+        main(list(args))
+    return exc.value.code
+
+
+@pytest.mark.parametrize("workers", ("1", "2"))
+def test_stats(cassettes, tmp_path, capsys, workers):
+    assert run("--workers", workers, "--json", "-", "stats", str(cassettes)) == 0
+    out, err = capsys.readouterr()
+    summary = json.loads(out)
+    assert summary["cassettes"] == 2
+    assert summary["interactions"] == 2
+    assert summary["hosts"] == {"httpbin.org": 2}
+    assert summary["results"][0]["largest_bodies"] == [{"uri": "http://httpbin.org/get", "size": 13}]
+    # Progress and the final message are written to stderr
+    assert "[2/2]" in err
+    assert err.endswith("Processed 2 cassette(s), 0 error(s)\n")
+
+
+def test_convert_and_recompress(cassettes, tmp_path):
+    report = tmp_path / "report.json"
+    assert run("--workers", "1", "--json", str(report), "convert", "jsonl", str(cassettes)) == 0
+    assert sorted(path.name for path in (cassettes / "test_api").iterdir()) == ["test_get.jsonl", "test_ip.jsonl"]
+    assert json.loads(report.read_text())["results"][0]["target"].endswith("test_get.jsonl")
+    assert run("--workers", "1", "recompress", "gzip", str(cassettes)) == 0
+    assert sorted(path.name for path in (cassettes / "test_api").iterdir()) == [
+        "test_get.jsonl.gz",
+        "test_ip.jsonl.gz",
+    ]
+    assert run("--workers", "1", "--json", str(report), "validate", str(cassettes)) == 0
+    assert json.loads(report.read_text())["invalid"] == 0
+
+
+def test_compact(cassettes, tmp_path):
+    report = tmp_path / "report.json"
+    args = ("--workers", "1", "--json", str(report), "compact", "--step", "drop_headers", "--drop-header", "Date")
+    assert run(*args, str(cassettes)) == 0
+    assert json.loads(report.read_text())["results"][0]["removed_interactions"] == 0
+
+
+@pytest.mark.parametrize(
+    "args",
+    (("convert", "json"), ("recompress", "gzip"), ("compact", "--step", "minify_json")),
+    ids=("convert", "recompress", "compact"),
+)
+def test_large_bodies(cassettes, get_cassette, args):
+    # Bodies of this size are decoded lazily
+    body = '{"data": "%s"}' % ("x" * LAZY_THRESHOLD)
+    (cassettes / "test_api" / "test_large.yaml").write_text(get_cassette.replace('{"get": true}', body))
+    assert run("--workers", "1", *args, str(cassettes)) == 0
+    (path,) = (cassettes / "test_api").glob("test_large.*")
+    _, responses = load(str(path))
+    assert responses[0]["body"]["string"] == body.encode()
+
+
+def test_validate(cassettes, tmp_path):
+    (cassettes / "test_api" / "test_broken.yaml").write_text("interactions: [")
+    report = tmp_path / "report.json"
+    assert run("--workers", "1", "--json", str(report), "validate", str(cassettes)) == 1
+    summary = json.loads(report.read_text())
+    assert summary["invalid"] == 1
+    assert not summary["results"][0]["valid"]
+    assert summary["results"][0]["error"].startswith("ParserError")
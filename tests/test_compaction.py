@@ -0,0 +1,116 @@
+import gzip
+import json
+
+import pytest
+import yaml
+from vcr.request import Request
+
+from pytest_recording.compaction import DEDUPLICATE, DROP_HEADERS, MINIFY_JSON, STEPS, Compactor
+from pytest_recording.exceptions import UsageError
+
+BODY = json.dumps({"key": "value", "items": [1, 2, 3]}, indent=4).encode()
+
+
+def make_response(body, **headers):
+    return {
+        "status": {"code": 200, "message": "OK"},
+        "headers": {"Content-Type": ["application/json"], "Date": ["Mon, 01 Jan 2024"], **headers},
+        "body": {"string": body},
+    }
+
+
+def test_compactor():
+    compactor = Compactor(frozenset(STEPS), frozenset({"date"}))
+    request = Request("GET", "http://httpbin.org/json", None, {"Date": "now", "Accept": "*/*"})
+    compressed = gzip.compress(BODY)
+    cassette_dict = {
+        "requests": [request, request, request],
+        "responses": [
+            make_response(compressed, **{"Content-Encoding": ["gzip"], "Content-Length": [str(len(compressed))]}),
+            make_response(BODY),
+            make_response(BODY, Date=["Tue, 02 Jan 2024"]),
+        ],
+    }
+    compacted = compactor.compact(cassette_dict)
+    # The decoded response has a different `Content-Length`, the other two are the same without the `Date` header
+    assert len(compacted["responses"]) == 2
+    first, second = compacted["responses"]
+    assert first["body"]["string"] == second["body"]["string"] == b'{"key":"value","items":[1,2,3]}'
+    assert "Content-Encoding" not in first["headers"]
+    assert first["headers"]["content-length"] == [str(len(first["body"]["string"]))]
+    assert "Date" not in second["headers"]
+    assert dict(compacted["requests"][0].headers) == {"Accept": "*/*"}
+    # The original interactions are not modified
+    assert cassette_dict["responses"][1]["body"]["string"] == BODY
+    assert "Date" in request.headers
+
+
+def test_savings():
+    compactor = Compactor(frozenset({MINIFY_JSON, DROP_HEADERS, DEDUPLICATE}), frozenset({"date"}))
+    request = Request("GET", "http://httpbin.org/json", None, {"Date": "now"})
+    cassette_dict = {"requests": [request, request], "responses": [make_response(BODY), make_response(BODY)]}
+    compacted, saved = compactor.compact_with_savings(cassette_dict)
+    minified = len(compacted["responses"][0]["body"]["string"])
+    # The minified body and dropped `Date` headers of the first interaction, the whole second one
+    first = len(BODY) - minified + len("Datenow") + len("DateMon, 01 Jan 2024")
+    second = len("Datenow") + len("Content-Typeapplication/json") + len("DateMon, 01 Jan 2024") + len(BODY)
+    assert saved == first + second
+
+
+def test_non_json():
+    compactor = Compactor(frozenset(STEPS))
+    response = {**make_response(b"{not json"), "headers": {"Content-Type": ["application/json"]}}
+    assert compactor.compact_interaction(Request("GET", "http://httpbin.org", None, {}), response)[1] is response
+
+
+def test_unknown_step():
+    with pytest.raises(UsageError, match="Unknown compaction steps: minify. Available steps: decode_encoding"):
+        Compactor.from_config({"compaction": ["minify"]}, [], [])
+
+
+def test_compaction(testdir, httpbin):
+    testdir.makeini(
+        """
+[pytest]
+recording_compaction =
+    decode_encoding
+    minify_json
+    drop_headers
+    deduplicate
+recording_compaction_drop_headers = Date
+    """
+    )
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr(allow_playback_repeats=True)
+def test_feature():
+    assert requests.get("{0}/gzip").json()["gzipped"]
+    assert requests.get("{0}/json").json()
+    assert requests.get("{0}/json").json()
+    """.format(httpbin.url)
+    )
+    result = testdir.runpytest("--record-mode=once")
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["*compacted cassettes*", "*test_compaction/test_feature.yaml: saved * bytes"])
+    with open(str(testdir.tmpdir.join("cassettes/test_compaction/test_feature.yaml"))) as fd:
+        interactions = yaml.safe_load(fd)["interactions"]
+    assert len(interactions) == 2
+    for interaction in interactions:
+        assert "Date" not in interaction["response"]["headers"]
+        assert "Content-Encoding" not in interaction["response"]["headers"]
+        assert "\n" not in interaction["response"]["body"]["string"]
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=1)
+
+
+def test_invalid_ini(testdir):
+    testdir.makeini(
+        """
+[pytest]
+recording_compaction = minify
+    """
+    )
+    result = testdir.runpytest()
+    result.stderr.fnmatch_lines(["ERROR: Invalid `recording_compaction` value: 'minify'. Available steps: *"])
@@ -0,0 +1,131 @@
+import json
+
+import pytest
+import yaml
+
+from pytest_recording.cli import main
+from pytest_recording.journal import compact_directory, get_journal_path, read_journal
+
+TEST_FILE = """
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_feature():
+    assert requests.get("{0}/get").status_code == 200
+    assert requests.get("{0}/{1}").status_code == 200
+"""
+
+
+def record(testdir, httpbin, endpoint, *args):
+    testdir.makepyfile(TEST_FILE.format(httpbin.url, endpoint))
+    return testdir.runpytest("--record-mode=new_episodes", "--recording-journal", *args)
+
+
+def get_uris(path):
+    with open(path) as fd:
+        return [interaction["request"]["uri"] for interaction in yaml.safe_load(fd)["interactions"]]
+
+
+@pytest.mark.parametrize("args", ((), ("-p", "no:cacheprovider", "--recording-write-workers=2")))
+def test_journal(testdir, httpbin, args):
+    cassette = str(testdir.tmpdir.join("cassettes/test_journal/test_feature.yaml"))
+    # When a cassette is recorded for the first time
+    record(testdir, httpbin, "headers", "--recording-keep-journal", *args).assert_outcomes(passed=1)
+    # Then it is written as usual
+    assert len(get_uris(cassette)) == 2
+    with open(cassette) as fd:
+        original = fd.read()
+    # When new interactions are recorded into it
+    record(testdir, httpbin, "ip", "--recording-keep-journal", *args).assert_outcomes(passed=1)
+    # Then they are appended to the journal and the cassette is not changed
+    with open(cassette) as fd:
+        assert fd.read() == original
+    requests, _ = read_journal(cassette)
+    assert [request.uri for request in requests] == [f"{httpbin.url}/ip"]
+    # And the journal is used during replaying
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=1)
+    # When the journal is compacted at the end of the session
+    record(testdir, httpbin, "uuid", *args).assert_outcomes(passed=1)
+    # Then all interactions are in the cassette
+    assert get_uris(cassette)[2:] == [f"{httpbin.url}/ip", f"{httpbin.url}/uuid"]
+    assert not testdir.tmpdir.join("cassettes/test_journal/test_feature.yaml.journal").exists()
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=1)
+
+
+def test_rewrite(testdir, httpbin):
+    record(testdir, httpbin, "headers").assert_outcomes(passed=1)
+    record(testdir, httpbin, "ip", "--recording-keep-journal").assert_outcomes(passed=1)
+    journal = testdir.tmpdir.join("cassettes/test_rewrite/test_feature.yaml.journal")
+    assert journal.exists()
+    # The journal is removed together with the cassette
+    testdir.runpytest("--record-mode=rewrite", "--recording-journal").assert_outcomes(passed=1)
+    assert not journal.exists()
+    assert len(get_uris(str(testdir.tmpdir.join("cassettes/test_rewrite/test_feature.yaml")))) == 2
+
+
+def test_compact_directory(testdir, httpbin, capsys):
+    record(testdir, httpbin, "headers").assert_outcomes(passed=1)
+    record(testdir, httpbin, "ip", "--recording-keep-journal").assert_outcomes(passed=1)
+    directory = str(testdir.tmpdir.join("cassettes"))
+    cassette = str(testdir.tmpdir.join("cassettes/test_compact_directory/test_feature.yaml"))
+    assert get_journal_path(cassette) == cassette + ".journal"
+    # Logs from the HTTP server
+    capsys.readouterr()
+    with pytest.raises(SystemExit):
+        main(["--workers", "1", "--json", "-", "journals", directory])
+    out, err = capsys.readouterr()
+    assert json.loads(out)["compacted"] == 1
+    assert err.endswith("Processed 1 cassette(s), 0 error(s)\n")
+    assert len(get_uris(cassette)) == 3
+    # Nothing to compact
+    assert compact_directory(directory) == 0
+
+
+def test_xdist_worker(testdir, httpbin):
+    record(testdir, httpbin, "headers").assert_outcomes(passed=1)
+    testdir.makeconftest(
+        """
+import json
+import pytest
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Pretend to be a `pytest-xdist` worker
+    config.workerinput = {}
+    config.workeroutput = {}
+
+def pytest_unconfigure(config):
+    with open("workeroutput.json", "w") as fd:
+        json.dump(config.workeroutput, fd)
+"""
+    )
+    record(testdir, httpbin, "ip").assert_outcomes(passed=1)
+    cassette = str(testdir.tmpdir.join("cassettes/test_xdist_worker/test_feature.yaml"))
+    # Then workers leave journals to the main process, other workers might still append to them
+    assert len(read_journal(cassette)[0]) == 1
+    with open(str(testdir.tmpdir.join("workeroutput.json"))) as fd:
+        assert json.load(fd)["recording_journals"] == {cassette: "vcr.serializers.yamlserializer"}
+
+
+def test_xdist(testdir, httpbin):
+    pytest.importorskip("xdist")
+    source = """
+import pytest
+import requests
+
+@pytest.mark.vcr
+@pytest.mark.default_cassette("shared")
+def test_{0}():
+    assert requests.get("{1}/{0}").status_code == 200
+"""
+    testdir.makepyfile(source.format("get", httpbin.url))
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=1)
+    # When multiple workers append to the same cassette
+    testdir.makepyfile("\n".join(source.format(endpoint, httpbin.url) for endpoint in ("ip", "uuid", "headers")))
+    result = testdir.runpytest("-n", "2", "--record-mode=new_episodes", "--recording-journal")
+    result.assert_outcomes(passed=3)
+    # Then no appended interactions are lost
+    cassette = str(testdir.tmpdir.join("cassettes/test_xdist/shared.yaml"))
+    assert len(get_uris(cassette)) == 4
+    assert read_journal(cassette) == ([], [])
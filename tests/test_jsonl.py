@@ -0,0 +1,75 @@
+import io
+import os
+
+from pytest_recording import jsonlserializer
+from pytest_recording.storage import append_file
+
+CASSETTE = {
+    "version": 1,
+    "interactions": [
+        {
+            "request": {"body": b"\xff\x00", "headers": {}, "method": "POST", "uri": "http://httpbin.org/post"},
+            "response": {"body": {"string": b"\x89PNG"}, "headers": {}, "status": {"code": 200, "message": "OK"}},
+        },
+        {
+            "request": {"body": None, "headers": {}, "method": "GET", "uri": "http://httpbin.org/get"},
+            "response": {"body": {"string": "text"}, "headers": {}, "status": {"code": 200, "message": "OK"}},
+        },
+    ],
+}
+
+
+def test_round_trip():
+    content = jsonlserializer.serialize(CASSETTE)
+    # One line for the header and for each interaction
+    assert content.count("\n") == 3
+    assert content.startswith('{"version":1}\n')
+    assert jsonlserializer.deserialize(content) == CASSETTE
+    # Streams are read line by line
+    assert jsonlserializer.deserialize(io.StringIO(content)) == CASSETTE
+
+
+def test_incomplete_last_line():
+    content = jsonlserializer.serialize(CASSETTE)
+    # When the last line is cut off
+    loaded = jsonlserializer.deserialize(content[:-10])
+    # Then it is ignored
+    assert loaded["interactions"] == CASSETTE["interactions"][:1]
+
+
+def test_append_file(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    first = jsonlserializer.serialize({**CASSETTE, "interactions": CASSETTE["interactions"][:1]})
+    assert append_file(path, first)
+    with open(path, "rb") as fd:
+        inode = os.fstat(fd.fileno()).st_ino
+    # When new interactions are added
+    assert append_file(path, jsonlserializer.serialize(CASSETTE))
+    # Then the file is appended in place
+    with open(path, "rb") as fd:
+        assert os.fstat(fd.fileno()).st_ino == inode
+        assert jsonlserializer.deserialize(fd.read().decode()) == CASSETTE
+    # And unchanged content is not written
+    assert not append_file(path, jsonlserializer.serialize(CASSETTE))
+
+
+def test_jsonl_cassettes(testdir, httpbin):
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.fixture
+def vcr_config():
+    return {{"serializer": "jsonl"}}
+
+@pytest.mark.vcr
+def test_feature():
+    assert requests.get("{0}/get").status_code == 200
+    assert requests.get("{0}/bytes/16").status_code == 200
+    """.format(httpbin.url)
+    )
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=1)
+    cassette = testdir.tmpdir.join("cassettes/test_jsonl_cassettes/test_feature.jsonl")
+    assert len(cassette.readlines()) == 3
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=1)
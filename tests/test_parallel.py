@@ -0,0 +1,62 @@
+import pytest
+from vcr.serializers import yamlserializer
+
+from pytest_recording._vcr import load_cassette, load_cassettes
+from pytest_recording.cache import CassetteCache
+from pytest_recording.parallel import LoadingPool, get_process_context
+
+
+@pytest.fixture
+def paths(get_response_cassette, ip_response_cassette, tmpdir):
+    return [str(get_response_cassette), str(tmpdir.join("missing.yaml")), str(ip_response_cassette)]
+
+
+@pytest.fixture(params=("thread", "process"))
+def pool(request):
+    pool = LoadingPool(2, kind=request.param)
+    yield pool
+    pool.shutdown()
+
+
+@pytest.mark.parametrize("with_cache", (True, False))
+def test_load_cassettes(pool, paths, with_cache):
+    cache = CassetteCache(max_size=1024) if with_cache else None
+    expected = [load_cassette(path, yamlserializer) for path in paths]
+    # When cassettes are loaded concurrently
+    # Then the results are in the declared order
+    assert repr(load_cassettes(paths, yamlserializer, pool, cache)) == repr(expected)
+    if with_cache:
+        # And they are stored in the cache
+        assert repr(load_cassettes(paths, yamlserializer, pool, cache)) == repr(expected)
+        assert cache.hits == 2
+
+
+def test_process_start_method():
+    # Forked workers would inherit locks held by the writer and preloader threads
+    assert get_process_context().get_start_method() in ("forkserver", "spawn")
+
+
+def test_threshold(paths):
+    assert LoadingPool(2).should_be_used(paths)
+    assert not LoadingPool(2, threshold=1024 * 1024).should_be_used(paths)
+    assert not LoadingPool(1).should_be_used(paths)
+    assert not LoadingPool(2).should_be_used(paths[:1])
+
+
+@pytest.mark.parametrize("kind", ("thread", "process"))
+def test_parallel_loading(testdir, get_response_cassette, ip_response_cassette, kind):
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr(r"{}", r"{}")
+def test_combined():
+    assert requests.get("http://httpbin.org/get").text == '{{"get": true}}'
+    assert requests.get("http://httpbin.org/ip").text == '{{"ip": true}}'
+""".format(get_response_cassette, ip_response_cassette)
+    )
+    result = testdir.runpytest(
+        "--recording-load-workers=2", "--recording-load-executor={}".format(kind), "--recording-parallel-threshold=0"
+    )
+    result.assert_outcomes(passed=1)
@@ -86,3 +86,126 @@ def test_lazy_vcr_config(testdir):
     result = testdir.runpytest()
     result.assert_outcomes(passed=1)
     assert result.ret == 0
+
+
+@pytest.mark.parametrize("with_libyaml, backend", ((True, "libyaml"), (False, "pure Python")))
+def test_yaml_backend_header(testdir, mocker, with_libyaml, backend):
+    # Does not depend on how PyYAML is built in the current environment
+    mocker.patch("yaml.__with_libyaml__", with_libyaml)
+    result = testdir.runpytest()
+    result.stdout.fnmatch_lines([f"recording: YAML backend: {backend}"])
+
+
+def test_require_fast_yaml(testdir, mocker):
+    # When only the pure Python YAML implementation is available
+    mocker.patch("yaml.__with_libyaml__", False)
+    testdir.makepyfile(
+        """
+        def test_():
+            pass
+    """
+    )
+    result = testdir.runpytest("--recording-require-fast-yaml")
+    # Then the run should fail if the fast one is required
+    result.stderr.fnmatch_lines(["*`--recording-require-fast-yaml` is passed, but PyYAML is built without `libyaml`*"])
+    assert result.ret == 4
+    # And work otherwise
+    result = testdir.runpytest()
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["recording: YAML backend: pure Python"])
+
+
+def test_fixtures_only_for_marked_tests(testdir):
+    testdir.makepyfile(
+        """
+        import pytest
+
+        def test_unmarked(request):
+            assert "vcr" not in request.fixturenames
+            assert "block_network" not in request.fixturenames
+
+        @pytest.mark.vcr
+        def test_vcr(request):
+            assert request.fixturenames.index("block_network") < request.fixturenames.index("vcr")
+
+        @pytest.mark.block_network
+        def test_block_network(request):
+            assert "block_network" in request.fixturenames
+            assert "vcr" not in request.fixturenames
+        """
+    )
+    # Fixtures are requested only by tests that need them
+    testdir.runpytest("--block-network", "-k", "vcr").assert_outcomes(passed=1)
+    testdir.runpytest("-k", "not vcr").assert_outcomes(passed=2)
+
+
+def test_fixtures_order(testdir, httpbin):
+    # When a function-scoped fixture makes requests
+    testdir.makepyfile(
+        """
+        import pytest
+        import requests
+
+        @pytest.fixture
+        def data():
+            return requests.get("{}/ip").json()
+
+        @pytest.mark.vcr
+        def test_fixture(data, vcr):
+            assert vcr.play_count == 0
+            assert len(vcr.data) == 1
+        """.format(httpbin.url)
+    )
+    # Then they are recorded, since the cassette is installed before other function-scoped fixtures
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=1)
+
+
+def test_markers_added_during_collection(testdir, httpbin):
+    # When markers are added by other plugins during collection
+    testdir.makeconftest(
+        """
+        import pytest
+
+        def pytest_collection_modifyitems(items):
+            for item in items:
+                item.add_marker(pytest.mark.vcr)
+        """
+    )
+    testdir.makepyfile(
+        """
+        import requests
+
+        def test_feature(vcr):
+            assert vcr is not None
+            assert requests.get("{}/ip").status_code == 200
+        """.format(httpbin.url)
+    )
+    # Then the cassette is used
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=1)
+    assert testdir.tmpdir.join("cassettes/test_markers_added_during_collection/test_feature.yaml").check()
+
+
+def test_recording_plan(testdir):
+    # When both `block_network` and `vcr` fixtures are used
+    testdir.makepyfile(
+        """
+        import pytest
+
+        CALLS = []
+
+        @pytest.fixture
+        def vcr_config():
+            CALLS.append(1)
+            return {"record_mode": "once", "match_on": ["uri"]}
+
+        @pytest.mark.block_network
+        @pytest.mark.vcr(record_mode="none")
+        def test_plan(vcr, recording_plan):
+            # Then the configuration is resolved once
+            assert len(CALLS) == 1
+            assert recording_plan.config == {"record_mode": "none", "match_on": ["uri"]}
+            assert recording_plan.item.record_mode == "none"
+            assert vcr.record_mode == "none"
+        """
+    )
+    testdir.runpytest().assert_outcomes(passed=1)
@@ -0,0 +1,109 @@
+import pytest
+
+TESTS = """
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_recorded():
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+
+@pytest.mark.vcr
+def test_missing():
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+
+@pytest.mark.vcr
+def test_broken():
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+
+@pytest.mark.vcr(record_mode="once")
+def test_new():
+    pass
+
+@pytest.mark.vcr("test_recorded.yaml")
+def test_extra():
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+
+def test_unmarked():
+    pass
+"""
+
+
+@pytest.fixture
+def cassettes(testdir, create_file, get_cassette):
+    testdir.makepyfile(test_preflight=TESTS)
+    create_file("cassettes/test_preflight/test_recorded.yaml", get_cassette)
+    create_file("cassettes/test_preflight/test_broken.yaml", "interactions: [")
+
+
+@pytest.mark.usefixtures("cassettes")
+@pytest.mark.parametrize("args", [(), ("--collect-only",)])
+def test_preflight(testdir, args):
+    result = testdir.runpytest("--recording-preflight", *args)
+    # Then all problems are reported before tests run
+    assert result.ret == pytest.ExitCode.USAGE_ERROR
+    result.stderr.fnmatch_lines(
+        [
+            "ERROR: Recording preflight found 2 problem(s):",
+            "  test_preflight.py::test_missing: missing cassette *test_preflight/test_missing.yaml",
+            "  test_preflight.py::test_broken: unreadable cassette *test_preflight/test_broken.yaml: *Error: *",
+        ]
+    )
+    # Missing cassettes are expected in the `once` mode and the default one is optional if there are extras
+    result.stderr.no_fnmatch_line("*test_new*")
+    result.stderr.no_fnmatch_line("*test_extra*")
+    assert "PASSED" not in result.stdout.str()
+
+
+@pytest.mark.usefixtures("cassettes")
+def test_preflight_selected(testdir):
+    # Only selected tests are checked, and cassettes loaded by the preflight are reused
+    result = testdir.runpytest("--recording-preflight", "-k", "recorded or extra")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(["Cassette cache: 2 hits, 1 misses, 0 evictions"])
+
+
+@pytest.mark.usefixtures("cassettes")
+def test_preflight_rewrite(testdir):
+    # Cassettes are not needed in the `rewrite` mode
+    result = testdir.runpytest("--recording-preflight", "--record-mode=rewrite", "--collect-only")
+    assert result.ret == pytest.ExitCode.OK
+
+
+@pytest.mark.parametrize(
+    "conftest",
+    (
+        # The cassette exists in another directory
+        """
+import os
+import pytest
+
+@pytest.fixture(scope="module")
+def vcr_cassette_dir(request):
+    return os.path.join(request.node.fspath.dirname, "other")
+""",
+        # The cassette is recorded in the `once` mode
+        """
+import pytest
+
+@pytest.fixture
+def vcr_config():
+    return {"record_mode": "once"}
+""",
+    ),
+    ids=("vcr_cassette_dir", "vcr_config"),
+)
+def test_overridden_fixtures(testdir, create_file, get_cassette, conftest):
+    testdir.makeconftest(conftest)
+    testdir.makepyfile(
+        """
+import pytest
+
+@pytest.mark.vcr
+def test_overridden():
+    pass
+"""
+    )
+    create_file("other/test_overridden.yaml", get_cassette)
+    # Tests with overridden recording fixtures are not checked, their cassettes are known only at run time
+    testdir.runpytest("--recording-preflight").assert_outcomes(passed=1)
@@ -0,0 +1,87 @@
+import threading
+
+from pytest_recording.preload import Preloader
+
+
+def test_budget(tmp_path):
+    plan = []
+    loaded = [threading.Event() for _ in range(3)]
+    for idx, event in enumerate(loaded):
+        path = tmp_path / f"{idx}.yaml"
+        path.write_bytes(b"x" * 10)
+        plan.append((f"test_{idx}", [(str(path), event.set)]))
+    # When cassettes don't fit into the budget together
+    preloader = Preloader(workers=2, budget=25)
+    preloader.start(plan)
+    assert loaded[0].wait(5)
+    assert loaded[1].wait(5)
+    # Then the next one is not loaded
+    assert not loaded[2].wait(0.1)
+    # Until a test that used some of them is finished
+    preloader.release("test_0")
+    assert loaded[2].wait(5)
+    preloader.close()
+
+
+def test_wait_for_not_started(tmp_path):
+    first, second = tmp_path / "first.yaml", tmp_path / "second.yaml"
+    first.write_bytes(b"x")
+    second.write_bytes(b"x")
+    started, blocker = threading.Event(), threading.Event()
+    loaded = []
+
+    def block():
+        started.set()
+        blocker.wait()
+
+    def fail():
+        raise AssertionError("Missing cassettes should not be loaded")
+
+    preloader = Preloader(workers=1, budget=100)
+    plan = [
+        ("test_0", [(str(tmp_path / "missing.yaml"), fail), (str(first), block)]),
+        ("test_1", [(str(second), lambda: loaded.append(second))]),
+    ]
+    preloader.start(plan)
+    started.wait()
+    # When a test needs a cassette that is not being loaded yet
+    preloader.wait_for(str(second))
+    blocker.set()
+    preloader.close()
+    # Then it is not loaded in background
+    assert not loaded
+
+
+def test_preload(testdir, create_file, get_cassette):
+    testdir.makepyfile(
+        """
+import time
+
+import pytest
+import requests
+from pytest_recording.state import get_state
+
+@pytest.fixture(scope="session", autouse=True)
+def wait_for_preload(pytestconfig):
+    # Not a part of the public API, makes the test deterministic
+    preloader = get_state(pytestconfig).preloader
+    while len(preloader._futures) < 2:
+        time.sleep(0.01)
+    for future in list(preloader._futures.values()):
+        future.result()
+
+@pytest.mark.vcr
+def test_first():
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+
+@pytest.mark.vcr
+def test_second():
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+"""
+    )
+    create_file("cassettes/test_preload/test_first.yaml", get_cassette)
+    create_file("cassettes/test_preload/test_second.yaml", get_cassette)
+    result = testdir.runpytest("--recording-preload")
+    result.assert_outcomes(passed=2)
+    # Then tests use already loaded cassettes
+    result.stdout.fnmatch_lines(["Cassette cache: 2 hits, 2 misses, 0 evictions"])
@@ -383,3 +383,109 @@ def test_feature():
     )
     result = testdir.runpytest("-s")
     assert "test_recording_configure_hook.py HOOK IS CALLED" in result.outlines
+
+
+@pytest.mark.parametrize("reuse, expected_calls", ((None, 2), (False, 3)))
+def test_vcr_reuse(testdir, create_file, get_cassette, reuse, expected_calls):
+    testdir.makeconftest(
+        """
+def pytest_recording_configure(config, vcr):
+    print("HOOK IS CALLED")
+
+def pytest_recording_reuse_vcr(config):
+    return {}
+        """.format(reuse)
+    )
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr
+@pytest.mark.default_cassette("shared.yaml")
+@pytest.mark.parametrize("idx", (1, 2))
+def test_feature(idx):
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+
+@pytest.mark.vcr(record_mode="new_episodes")
+def test_other():
+    pass
+    """
+    )
+    create_file("cassettes/test_vcr_reuse/shared.yaml", get_cassette)
+    result = testdir.runpytest("-s")
+    result.assert_outcomes(passed=3)
+    # Then VCR instances are shared by tests with the same settings unless disabled via the hook
+    assert result.stdout.str().count("HOOK IS CALLED") == expected_calls
+
+
+def test_vcr_reuse_custom_persister(testdir, create_file, get_cassette):
+    # When a hook registers a custom persister
+    testdir.makeconftest(
+        """
+from vcr.persisters.filesystem import FilesystemPersister
+
+class Persister(FilesystemPersister):
+    @classmethod
+    def load_cassette(cls, cassette_path, serializer):
+        return super().load_cassette(cassette_path.replace("test_feature", "custom"), serializer)
+
+def pytest_recording_configure(config, vcr):
+    vcr.register_persister(Persister)
+        """
+    )
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr
+@pytest.mark.parametrize("idx", (1, 2))
+def test_feature(idx):
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+    """
+    )
+    create_file("cassettes/test_vcr_reuse_custom_persister/custom[1].yaml", get_cassette)
+    create_file("cassettes/test_vcr_reuse_custom_persister/custom[2].yaml", get_cassette)
+    # Then it is used by all tests
+    testdir.runpytest("--record-mode=none").assert_outcomes(passed=2)
+
+
+@pytest.mark.parametrize("path, expected_calls", (("/get", 1), ("/ip", 2)))
+def test_lazy_extra_cassettes(testdir, mocker, create_file, get_cassette, ip_response_cassette, path, expected_calls):
+    # When extra cassettes are loaded lazily
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr(r"{}", r"{}", lazy_extra_cassettes=True)
+def test_feature():
+    assert requests.get("http://httpbin.org{}").status_code == 200
+    """.format(ip_response_cassette, testdir.tmpdir.join("missing.yaml"), path)
+    )
+    create_file("cassettes/test_lazy_extra_cassettes/test_feature.yaml", get_cassette)
+    mocked_load_cassette = mocker.patch("pytest_recording._vcr.load_cassette", wraps=load_cassette)
+    result = testdir.runpytest()
+    result.assert_outcomes(passed=1)
+    # Then extra cassettes are loaded only if the default one does not contain a matching request
+    assert mocked_load_cassette.call_count == expected_calls
+
+
+def test_lazy_extra_cassettes_missing_default(testdir, mocker, get_response_cassette, ip_response_cassette):
+    # When the default cassette is missing
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr(r"{}", r"{}", lazy_extra_cassettes=True)
+def test_feature():
+    assert requests.get("http://httpbin.org/get").status_code == 200
+    """.format(get_response_cassette, ip_response_cassette)
+    )
+    mocked_load_cassette = mocker.patch("pytest_recording._vcr.load_cassette", wraps=load_cassette)
+    result = testdir.runpytest()
+    result.assert_outcomes(passed=1)
+    # Then the first existing extra cassette is loaded instead
+    assert mocked_load_cassette.call_count == 2
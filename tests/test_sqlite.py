@@ -0,0 +1,137 @@
+import copy
+import os
+import pickle
+
+import pytest
+
+from pytest_recording.bodies import LazyBody
+from pytest_recording.cli import main
+from pytest_recording.sqlite import CassetteDatabase, export_cassettes, import_cassettes
+
+TEST_FILE = """
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_feature():
+    assert requests.get("{}/get").status_code == 200
+"""
+
+
+@pytest.fixture
+def sqlite_store(testdir):
+    def inner(scope="module"):
+        testdir.makeini(
+            f"""
+[pytest]
+recording_store = sqlite
+recording_sqlite_scope = {scope}
+    """
+        )
+
+    return inner
+
+
+def test_lazy_body():
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {"string": b"content"}
+
+    body = LazyBody(loader)
+    # Copies made by VCR are not loaded
+    copied = copy.deepcopy(body)
+    assert not calls
+    assert copied["string"] == b"content"
+    assert body.get("string") == b"content"
+    assert len(calls) == 2
+    assert pickle.loads(pickle.dumps(body)) == {"string": b"content"}
+
+
+@pytest.mark.parametrize(
+    "scope, database", (("module", "cassettes/test_sqlite_store.sqlite"), ("session", "cassettes.sqlite"))
+)
+def test_sqlite_store(testdir, httpbin, sqlite_store, scope, database):
+    sqlite_store(scope)
+    testdir.makepyfile(TEST_FILE.format(httpbin.url))
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=1)
+    # Then the cassette is stored in the database
+    assert testdir.tmpdir.join(database).exists()
+    assert not testdir.tmpdir.join("cassettes/test_sqlite_store/test_feature.yaml").exists()
+    # And it is replayed
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=1)
+
+
+def test_rewrite(testdir, httpbin, sqlite_store):
+    sqlite_store()
+    testdir.makepyfile(TEST_FILE.format(httpbin.url))
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=1)
+    testdir.runpytest("--record-mode=rewrite").assert_outcomes(passed=1)
+    database = CassetteDatabase(str(testdir.tmpdir.join("cassettes/test_rewrite.sqlite")))
+    requests, _ = database.load("test_rewrite/test_feature.yaml")
+    assert len(requests) == 1
+
+
+def test_fallback_to_files(testdir, create_file, get_cassette, sqlite_store):
+    # When a cassette is not in the database
+    sqlite_store()
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_feature():
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+    """
+    )
+    create_file("cassettes/test_fallback_to_files/test_feature.yaml", get_cassette)
+    # Then the cassette file is used
+    testdir.runpytest("--record-mode=none").assert_outcomes(passed=1)
+
+
+def test_import_export(tmp_path, get_cassette):
+    source = tmp_path / "cassettes" / "test_api" / "test_feature.yaml"
+    source.parent.mkdir(parents=True)
+    source.write_text(get_cassette)
+    database = CassetteDatabase(str(tmp_path / "cassettes" / "test_api.sqlite"))
+    assert import_cassettes(database, str(source.parent)) == 1
+    assert database.names() == ["test_api/test_feature.yaml"]
+    requests, responses = database.load("test_api/test_feature.yaml")
+    assert requests[0].uri == "http://httpbin.org/get"
+    assert responses[0]["body"]["string"] == b'{"get": true}'
+    assert export_cassettes(database, str(tmp_path / "exported")) == 1
+    exported = tmp_path / "exported" / "test_api" / "test_feature.yaml"
+    assert "http://httpbin.org/get" in exported.read_text()
+    # Round trip gives the same cassette
+    other = CassetteDatabase(str(tmp_path / "exported" / "test_api.sqlite"))
+    import_cassettes(other, str(exported.parent))
+    other_requests, other_responses = other.load("test_api/test_feature.yaml", lazy=False)
+    assert [request._to_dict() for request in other_requests] == [request._to_dict() for request in requests]
+    assert other_responses == responses
+
+
+def test_cli(tmp_path, get_cassette, capsys):
+    source = tmp_path / "test_api" / "test_feature.yaml"
+    source.parent.mkdir()
+    source.write_text(get_cassette)
+    database = str(tmp_path / "test_api.sqlite")
+    with pytest.raises(SystemExit):
+        main(["sqlite", "import", database, str(source.parent)])
+    assert capsys.readouterr().err == "Processed 1 cassette(s), 0 error(s)\n"
+    os.remove(str(source))
+    with pytest.raises(SystemExit):
+        main(["sqlite", "export", database])
+    assert source.exists()
+
+
+def test_invalid_store(testdir):
+    testdir.makeini(
+        """
+[pytest]
+recording_store = redis
+    """
+    )
+    result = testdir.runpytest()
+    result.stderr.fnmatch_lines(["ERROR: Invalid `recording_store` value: 'redis'. Available stores: files, sqlite"])
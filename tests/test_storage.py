@@ -0,0 +1,146 @@
+import gzip
+import os
+
+import pytest
+
+from pytest_recording.storage import UMASK, open_text, resolve_path, write_file
+
+
+def test_write_file(tmp_path):
+    path = str(tmp_path / "nested" / "cassette.yaml")
+    assert write_file(path, "content")
+    with open(path) as fd:
+        assert fd.read() == "content"
+    assert os.stat(path).st_mode & 0o777 == 0o666 & ~UMASK
+    # No temporary files are left
+    assert os.listdir(str(tmp_path / "nested")) == ["cassette.yaml"]
+
+
+def test_unchanged(tmp_path):
+    path = str(tmp_path / "cassette.yaml")
+    write_file(path, "content")
+    os.utime(path, (0, 0))
+    # When the content is the same
+    # Then the file is not written
+    assert not write_file(path, "content")
+    assert os.stat(path).st_mtime == 0
+    # When the content is different, but has the same size
+    assert write_file(path, "CONTENT")
+    assert os.stat(path).st_mtime != 0
+    # Or a different size
+    assert write_file(path, "other")
+
+
+def test_failed_write(tmp_path, mocker):
+    path = str(tmp_path / "cassette.yaml")
+    write_file(path, "content")
+    # When writing fails midway
+    mocker.patch("os.replace", side_effect=KeyboardInterrupt)
+    with pytest.raises(KeyboardInterrupt):
+        write_file(path, "other")
+    # Then the original file is intact
+    with open(path) as fd:
+        assert fd.read() == "content"
+    assert os.listdir(str(tmp_path)) == ["cassette.yaml"]
+
+
+def test_unchanged_cassette(testdir, create_file, get_cassette):
+    # When an existing cassette is saved without changes
+    testdir.makepyfile(
+        """
+import pytest
+
+@pytest.mark.vcr
+def test_feature(vcr):
+    vcr.dirty = True
+    """
+    )
+    path = create_file("cassettes/test_unchanged_cassette/test_feature.yaml", get_cassette)
+    testdir.runpytest("--record-mode=all").assert_outcomes(passed=1)
+    os.utime(str(path), (0, 0))
+    testdir.runpytest("--record-mode=new_episodes").assert_outcomes(passed=1)
+    # Then it is not written again
+    assert path.mtime() == 0
+
+
+@pytest.mark.parametrize("suffix", (".gz", ".xz", ".bz2"))
+def test_compressed_write_file(tmp_path, suffix):
+    path = str(tmp_path / ("cassette.yaml" + suffix))
+    assert write_file(path, "content")
+    with open(path, "rb") as fd:
+        assert fd.read() != b"content"
+    with open_text(path) as fd:
+        assert fd.read() == "content"
+    # Compression is deterministic, so unchanged cassettes are detected
+    assert not write_file(path, "content")
+
+
+def test_resolve_path(tmp_path):
+    path = str(tmp_path / "cassette.yaml.gz")
+    # When the compressed cassette doesn't exist
+    (tmp_path / "cassette.yaml").write_text("content")
+    # Then the uncompressed one is used
+    assert resolve_path(path) == str(tmp_path / "cassette.yaml")
+    write_file(path, "content")
+    assert resolve_path(path) == path
+
+
+def test_compressed_cassettes(testdir, httpbin):
+    testdir.makeini(
+        """
+[pytest]
+recording_compression = gzip
+    """
+    )
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_feature():
+    assert requests.get("{}/get").status_code == 200
+    """.format(httpbin.url)
+    )
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=1)
+    path = testdir.tmpdir.join("cassettes/test_compressed_cassettes/test_feature.yaml.gz")
+    with gzip.open(str(path), "rt") as fd:
+        assert "/get" in fd.read()
+    # Compressed cassettes are replayed
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=1)
+
+
+def test_compression_of_existing_cassettes(testdir, create_file, get_cassette):
+    # When compression is enabled for an existing uncompressed cassette
+    testdir.makeini(
+        """
+[pytest]
+recording_compression = lzma
+    """
+    )
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_feature():
+    assert requests.get("http://httpbin.org/get").text == '{"get": true}'
+    """
+    )
+    create_file("cassettes/test_compression_of_existing_cassettes/test_feature.yaml", get_cassette)
+    # Then it is still used
+    testdir.runpytest("--record-mode=none").assert_outcomes(passed=1)
+
+
+def test_invalid_compression(testdir):
+    testdir.makeini(
+        """
+[pytest]
+recording_compression = zip
+    """
+    )
+    result = testdir.runpytest()
+    result.stderr.fnmatch_lines(
+        ["ERROR: Invalid `recording_compression` value: 'zip'. Available codecs: gzip, lzma, bz2"]
+    )
@@ -0,0 +1,68 @@
+import io
+
+from pytest_recording.streaming import ChunkedBody, StreamingVCRHTTPResponse
+
+
+def test_chunked_body():
+    body = ChunkedBody(b"abcdefgh", chunk_size=3)
+    # Reads return at most `chunk_size` bytes
+    assert body.read(5) == b"abc"
+    assert body.read1() == b"def"
+    assert body.read() == b"gh"
+    assert body.read(1) == b""
+    body.seek(-2, io.SEEK_END)
+    assert body.read() == b"gh"
+    body.seek(0)
+    assert io.BufferedReader(body).read() == b"abcdefgh"
+
+
+def test_readline():
+    body = ChunkedBody(b"first\nsecond\nlast", chunk_size=2)
+    assert body.readline() == b"first\n"
+    assert body.readline(3) == b"sec"
+    assert list(body) == [b"ond\n", b"last"]
+    assert body.readline() == b""
+
+
+def test_closed_response():
+    response = StreamingVCRHTTPResponse(
+        {"status": {"code": 200, "message": "OK"}, "headers": {}, "body": {"string": b"content"}}
+    )
+    assert response.read(3) == b"con"
+    response.close()
+    # Then the content is still available, the same as for VCR responses
+    assert response.data == b"content"
+    assert response.length_remaining == 4
+    # And closed bodies return empty values
+    body = ChunkedBody(b"content", chunk_size=2)
+    body.close()
+    assert body.getbuffer().nbytes == body.tell() == 0
+    assert body.readline() == b""
+
+
+def test_streaming_playback(testdir, httpbin):
+    testdir.makeini(
+        """
+[pytest]
+recording_blob_threshold = 1
+recording_blob_mmap = true
+    """
+    )
+    testdir.makepyfile(
+        """
+import pytest
+import requests
+
+@pytest.mark.vcr(stream_chunk_size=1024)
+def test_feature(vcr):
+    response = requests.get("{}/range/4096", stream=True)
+    chunks = list(response.raw.read1() for _ in range(5))
+    assert [len(chunk) for chunk in chunks] == [1024, 1024, 1024, 1024, 0]
+    assert b"".join(chunks) == (b"abcdefghijklmnopqrstuvwxyz" * 158)[:4096]
+    if vcr.play_count:
+        # The body is read directly from the blob file
+        assert not vcr.responses[0]["body"].is_loaded
+    """.format(httpbin.url)
+    )
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=1)
+    testdir.runpytest("--record-mode=none", "--block-network").assert_outcomes(passed=1)
@@ -0,0 +1,179 @@
+import pytest
+import yaml
+
+from pytest_recording.usage import UsageTracker
+
+RECORD = """
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_feature():
+    assert requests.get("{0}/get").status_code == 200
+    assert requests.get("{0}/ip").status_code == 200
+
+@pytest.mark.vcr
+def test_other():
+    assert requests.get("{0}/uuid").status_code == 200
+"""
+REPLAY = """
+import pytest
+import requests
+
+@pytest.mark.vcr
+def test_feature():
+    assert requests.get("{0}/ip").status_code == 200
+
+@pytest.mark.vcr
+def test_other():
+    assert requests.get("{0}/uuid").status_code == {1}
+"""
+
+
+def get_uris(path):
+    with open(path) as fd:
+        return [interaction["request"]["uri"] for interaction in yaml.safe_load(fd)["interactions"]]
+
+
+def test_prune(testdir, httpbin):
+    testdir.makepyfile(RECORD.format(httpbin.url))
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=2)
+    # When only some interactions are replayed
+    testdir.makepyfile(REPLAY.format(httpbin.url, 200))
+    result = testdir.runpytest("--record-mode=none", "--recording-prune")
+    result.assert_outcomes(passed=2)
+    # Then the unused ones are removed
+    cassette = str(testdir.tmpdir.join("cassettes/test_prune/test_feature.yaml"))
+    assert get_uris(cassette) == [f"{httpbin.url}/ip"]
+    assert len(get_uris(str(testdir.tmpdir.join("cassettes/test_prune/test_other.yaml")))) == 1
+    # And the savings are reported
+    result.stdout.fnmatch_lines(
+        [
+            "*test_prune/test_feature.yaml: removed 1 of 2 interactions, * bytes",
+            "Pruned 1 interactions, * bytes in total",
+        ]
+    )
+    testdir.runpytest("--record-mode=none").assert_outcomes(passed=2)
+
+
+def test_track_usage(testdir, httpbin):
+    testdir.makepyfile(RECORD.format(httpbin.url))
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=2)
+    testdir.makepyfile(REPLAY.format(httpbin.url, 200))
+    result = testdir.runpytest("--record-mode=none", "--recording-track-usage")
+    result.assert_outcomes(passed=2)
+    result.stdout.fnmatch_lines(["Cassette usage: 1 of 2 cassettes have interactions that were not replayed"])
+    # Cassettes are not changed without `--recording-prune`
+    assert len(get_uris(str(testdir.tmpdir.join("cassettes/test_track_usage/test_feature.yaml")))) == 2
+
+
+def test_not_pruned(testdir, httpbin):
+    testdir.makepyfile(RECORD.format(httpbin.url))
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=2)
+    cassette = str(testdir.tmpdir.join("cassettes/test_not_pruned/test_feature.yaml"))
+    # When some tests fail
+    testdir.makepyfile(REPLAY.format(httpbin.url, 201))
+    result = testdir.runpytest("--record-mode=none", "--recording-prune")
+    result.assert_outcomes(passed=1, failed=1)
+    # Then cassettes are not pruned, because the usage is incomplete
+    result.stdout.fnmatch_lines(["Cassettes are not pruned: some tests failed, were skipped or deselected"])
+    assert len(get_uris(cassette)) == 2
+    # The same for deselected tests
+    testdir.runpytest("--record-mode=none", "--recording-prune", "-k", "feature").assert_outcomes(passed=1)
+    assert len(get_uris(cassette)) == 2
+
+
+def test_extra_cassettes(testdir, httpbin):
+    testdir.makepyfile(RECORD.format(httpbin.url))
+    testdir.runpytest("--record-mode=once").assert_outcomes(passed=2)
+    # When a cassette is used as an extra one
+    testdir.makepyfile(
+        f"""
+import pytest
+import requests
+
+@pytest.mark.vcr("test_feature.yaml")
+def test_other():
+    assert requests.get("{httpbin.url}/get").status_code == 200
+    assert requests.get("{httpbin.url}/uuid").status_code == 200
+    """
+    )
+    testdir.runpytest("--record-mode=none", "--recording-prune").assert_outcomes(passed=1)
+    # Then its usage is tracked as well
+    assert get_uris(str(testdir.tmpdir.join("cassettes/test_extra_cassettes/test_feature.yaml"))) == [
+        f"{httpbin.url}/get"
+    ]
+
+
+def test_merge():
+    # Usage from multiple workers
+    first, second = UsageTracker(), UsageTracker()
+    first.add("/cassettes/a.yaml", "vcr.serializers.yamlserializer", 3, [0])
+    second.add("/cassettes/a.yaml", "vcr.serializers.yamlserializer", 3, [2])
+    second.add("/cassettes/b.yaml", "vcr.serializers.yamlserializer", 1, [0])
+    second.mark_modified("/cassettes/c.yaml")
+    first.merge(second.dump())
+    assert first.cassettes["/cassettes/a.yaml"].used == {0, 2}
+    assert set(first.get_unused()) == {"/cassettes/a.yaml"}
+    # Different sizes mean that the cassette was changed
+    first.add("/cassettes/a.yaml", "vcr.serializers.yamlserializer", 4, [])
+    assert not first.get_unused()
+    assert "/cassettes/c.yaml" in first.modified
+
+
+@pytest.mark.parametrize(
+    "skip", ("@pytest.mark.skipif(SKIP, reason='skip')", "@pytest.mark.xfail(SKIP, reason='xfail', run=False)")
+)
+def test_skipped_tests(testdir, httpbin, skip):
+    source = f"""
+import pytest
+import requests
+
+SKIP = {{}}
+
+@pytest.mark.vcr
+@pytest.mark.default_cassette("shared")
+def test_a():
+    assert requests.get("{httpbin.url}/ip").status_code == 200
+
+{skip}
+@pytest.mark.vcr
+@pytest.mark.default_cassette("shared")
+def test_b():
+    assert requests.get("{httpbin.url}/uuid").status_code == 200
+"""
+    testdir.makepyfile(source.format(False))
+    testdir.runpytest("--record-mode=new_episodes").assert_outcomes(passed=2)
+    # When a test that uses the cassette does not run
+    testdir.makepyfile(source.format(True))
+    result = testdir.runpytest("--record-mode=none", "--recording-prune")
+    assert result.ret == 0
+    # Then its interactions are not pruned
+    result.stdout.fnmatch_lines(["Cassettes are not pruned: some tests failed, were skipped or deselected"])
+    assert len(get_uris(str(testdir.tmpdir.join("cassettes/test_skipped_tests/shared.yaml")))) == 2
+
+
+@pytest.mark.parametrize("args", (("test_a.py",), ("test_a.py::test_a",), ("--deselect", "test_b.py::test_b")))
+def test_partial_run(testdir, create_file, get_cassette, ip_cassette, args):
+    # A cassette shared by tests in different modules
+    shared = create_file("shared.yaml", get_cassette + ip_cassette.split("interactions:")[1])
+    source = """
+import pytest
+import requests
+
+@pytest.mark.vcr(r"{}")
+def test_{}():
+    assert requests.get("http://httpbin.org/{}").status_code == 200
+"""
+    testdir.makepyfile(test_a=source.format(shared, "a", "get"), test_b=source.format(shared, "b", "ip"))
+    # When only some of the tests are selected
+    result = testdir.runpytest("--record-mode=none", "--recording-prune", *args)
+    result.assert_outcomes(passed=1)
+    # Then the cassette is not pruned
+    result.stdout.fnmatch_lines(["Cassettes are not pruned: only a part of the test tree was selected*"])
+    assert len(get_uris(str(shared))) == 2
+    testdir.runpytest("--record-mode=none", "test_b.py").assert_outcomes(passed=1)
+    # The whole tree passed explicitly is not a partial run
+    result = testdir.runpytest("--record-mode=none", "--recording-prune", ".")
+    result.assert_outcomes(passed=2)
+    result.stdout.no_fnmatch_line("*not pruned*")
@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from pytest_recording.writer import CassetteWriter
+
+
+@pytest.fixture
+def writer():
+    writer = CassetteWriter(2)
+    yield writer
+    writer.close()
+
+
+def test_wait_for(writer, tmp_path):
+    path = str(tmp_path / "cassette.yaml")
+    started = threading.Event()
+    release = threading.Event()
+
+    def write():
+        started.set()
+        release.wait()
+        with open(path, "w") as fd:
+            fd.write("done")
+
+    writer.submit(path, write, "test_id")
+    started.wait()
+    waiter = threading.Thread(target=writer.wait_for, args=(path,))
+    waiter.start()
+    # Then readers are blocked until the pending write is finished
+    waiter.join(0.05)
+    assert waiter.is_alive()
+    release.set()
+    waiter.join()
+    with open(path) as fd:
+        assert fd.read() == "done"
+    # And other paths are not blocked
+    writer.wait_for(str(tmp_path / "other.yaml"))
+
+
+def test_errors(writer):
+    def write():
+        raise OSError("No space left on device")
+
+    writer.submit("cassette.yaml", write, "test_id")
+    writer.flush()
+    assert len(writer.errors) == 1
+    assert writer.errors[0].nodeid == "test_id"
+    assert str(writer.errors[0].error) == "No space left on device"
+
+
+def test_background_writes(testdir):
+    testdir.makepyfile(
+        """
+        import pytest
+        import requests
+
+        @pytest.mark.vcr
+        def test_first(httpbin):
+            assert requests.get(httpbin.url + "/get").status_code == 200
+
+        @pytest.mark.vcr
+        @pytest.mark.default_cassette("test_first")
+        def test_second(vcr):
+            # The cassette written by the previous test is loaded
+            assert len(vcr) == 1
+    """
+    )
+    result = testdir.runpytest("--record-mode=once", "--recording-write-workers=2")
+    result.assert_outcomes(passed=2)
+    assert testdir.tmpdir.join("cassettes/test_background_writes/test_first.yaml").size()
+
+
+def test_background_write_error(testdir):
+    # When a cassette can not be written in the background
+    testdir.makepyfile(
+        """
+        import pytest
+        import requests
+
+        def before_record_response(response):
+            response["unknown"] = object()
+            return response
+
+        @pytest.mark.vcr(before_record_response=before_record_response)
+        def test_broken(httpbin):
+            assert requests.get(httpbin.url + "/get").status_code == 200
+    """
+    )
+    result = testdir.runpytest("--record-mode=once", "--recording-write-workers=1")
+    # Then the error should be reported together with the test that produced it
+    result.stdout.fnmatch_lines(["*cassette write errors*", "ERROR test_background_write_error.py::test_broken - *"])
+    assert result.ret == 1